@@ -8,12 +8,15 @@
 # Created:     27.06.2020
 #-------------------------------------------------------------------------------
 import math
+import numpy as np
 import utils
+import tracing
 
 from radiators import FinnedRadiator
 from elements import ElectronicElement, SetElectronicElements
 
 from radiators import fin_radiator_generator as radiator_generator
+from radiators import select_radiator
 
 
 
@@ -31,21 +34,37 @@ def f1xy(L, B, n, alff, dks):
 
     Понятия не имею, что делает эта функция. Вроде как, считает растекание
     теплоты по радиатору в направлениях l и b.
+
+    Гиперболические функции исходной формулы сведены к экспонентам убывающих
+    аргументов (см. _f1), поэтому расчёт не переполняется на длинных радиаторах.
+
+    >>> round(f1xy(0.1, 0.1, 2, 50, 0.008), 6)
+    0.053615
+    >>> round(f1xy(3, 0.1, 1, 300, 0.008), 6)
+    0.034039
     """
-    def f1(L, B, alf3, dks):
-        by = 1.2 * alf3 * L**2
-        r = 2 * math.sqrt(by)
-        px = B/L * math.sqrt(by * (1.5 - 1/(1 + math.sinh(r)/r)))
-        dkss = dks/B
-        kx = 2 * math.sinh(px * dkss) * math.cosh(0.5 * px)/math.sinh(px)
-        fi = kx * math.cosh(0.5 * px) - math.cosh(px * dkss) + 1
-        return fi
-
-    f1x = f1(L/n, B, alff, dks)
-    f1y = f1(B, L/n, alff, dks)
+    f1x = _f1(L/n, B, alff, dks)
+    f1y = _f1(B, L/n, alff, dks)
     return f1x*f1y
 
 
+def _f1(L, B, alf3, dks, exp=math.exp, expm1=math.expm1, sqrt=math.sqrt):
+    """
+    Растекание в одном направлении. Исходная запись:
+        r = 2*sqrt(by), px = B/L*sqrt(by*(1.5 - 1/(1 + sinh(r)/r)))
+        fi = 2*sinh(a)*cosh(px/2)**2/sinh(px) - cosh(a) + 1, a = px*dks/B
+    Тождественно fi = 1 + sinh(a - px/2)/sinh(px/2), а r/(r + sinh(r)) =
+    2r*e^-r/(2r*e^-r + 1 - e^-2r); в таком виде все экспоненты не больше 1.
+    Через exp, expm1 и sqrt передаются функции math или numpy.
+    """
+    by = 1.2 * alf3 * L**2
+    r = 2 * sqrt(by)
+    e = 2 * r * exp(-r)
+    px = B/L * sqrt(by * (1.5 - e/(e - expm1(-2 * r))))
+    a = px * dks/B
+    return 1 + (exp(a - px) - exp(-a))/-expm1(-px)
+
+
 def number_Gr(t, dt_max, l):
     """
     param:
@@ -226,15 +245,103 @@ def cooling_power(radiator, tb, dtr, n, fr1, k, dks, s):
     bet = fp/(4*n*dks**2) * f1xy(l, b, n, alff, dks)       # Вытекающий коэффициент растекания тепла
     pp = alpha2power(alff, fp, dtr)/bet
 
-    print("pp = {0}; fr = {1}".format(pp, fr))
+    if tracing.tracer is not None:
+        tracing.tracer('RRE.cooling_power', {'pp': pp, 'fr': fr, 'pr': pr, 'p0': p0, 'pl0': pl0,
+                                             'plr': plr, 'alff': alff, 'bet': bet})
     return pp
 
 
-def main():
+def f1xy_array(L, B, n, alff, dks):
+    """
+    Векторный вариант f1xy: все параметры могут быть массивами numpy
+    (с приведением размерностей по правилам broadcasting).
+    """
+    L, B, n, alff, dks = (np.asarray(x, dtype=float) for x in (L, B, n, alff, dks))
+    f1x = _f1(L/n, B, alff, dks, np.exp, np.expm1, np.sqrt)
+    f1y = _f1(B, L/n, alff, dks, np.exp, np.expm1, np.sqrt)
+    return f1x*f1y
+
+
+def cooling_power_array(length, width, fin_height, tb, dtr, n, fr1, k, dks,
+                        step=10E-3, fin_thick=1E-3, base_thick=4E-3):
+    """
+    param:
+        length, width, fin_height, step, fin_thick, base_thick : array_like
+            Геометрия радиаторов (см. FinnedRadiator) [м]
+        tb, dtr, n, fr1, k, dks : array_like
+            Условия расчёта, как в cooling_power
+
+    Пакетный расчёт мощности, отводимой радиаторами. Все параметры приводятся
+    друг к другу по правилам broadcasting numpy, так что одним вызовом
+    считается весь каталог радиаторов (или сетка геометрий x условий).
+    Возвращает dict массивов со всеми составляющими теплового баланса:
+    pr, p0, pl0, plr, alff, bet, pp.
+
+    >>> rad = FinnedRadiator(0.1, 0.1, 0.02)
+    >>> res = cooling_power_array([0.1, 0.05], [0.1, 0.052], 0.02, 25, 40, 2, 0.001, 1, 0.008)
+    >>> sorted(res)
+    ['alff', 'bet', 'p0', 'pl0', 'plr', 'pp', 'pr']
+    >>> bool(np.isclose(res['pp'][0], cooling_power(rad, 25, 40, 2, 0.001, 1, 0.008, 0.01)))
+    True
+    >>> both = cooling_power_array(0.1, 0.1, 0.02, 25, 40, 2, 0.001, [1, 2], 0.008,
+    ...                            step=[0.01, 0.01], fin_thick=[1E-3, 1E-3])['pp']
+    >>> one = [cooling_power_array(0.1, 0.1, 0.02, 25, 40, 2, 0.001, k, 0.008)['pp'] for k in (1, 2)]
+    >>> bool(np.allclose(both, one)), bool(both[0] < both[1])
+    (True, True)
+    """
+    l, b, h1, step, fin_thick, base_thick, tb, dtr, n, fr1, k, dks = (
+        np.asarray(x, dtype=float) for x in (length, width, fin_height, step, fin_thick, base_thick,
+                                             tb, dtr, n, fr1, k, dks))
+
+    # Геометрия, как в FinnedRadiator
+    nz = np.floor_divide(b - fin_thick, step) + 1
+    dell = (step - fin_thick) / 2
+    fr = np.maximum((nz - 1) * (l * h1 * 2) - fr1, 0)
+    f0 = l * b + 2 * h1 * l + 2 * base_thick * (l + b) + 2 * nz * h1 * fin_thick
+    fp = l * b
+
+    # Числа Нуссельта (см. nusselt_free_fins и nusselt_free_plane)
+    c = number_Gr(tb, dtr, dell) * dell/l
+    q = 12.84 + c
+    nu_fins = 6 * c/q * 1/(1 + np.sqrt(1 + (51.4 * c)/q ** 2))
+    a = 0.7 * number_Gr(tb, dtr, l)
+    nu_plane = np.where(a <= 5E2, 1.18 * a ** 0.125, 0.135 * a ** 0.33)
+
+    pr = alpha2power(number_Alfa(nu_fins, dell), fr, dtr)
+    p0 = alpha2power(number_Alfa(nu_plane, l), f0, dtr)
+
+    alfl, alflr = number_Alfa_radiation(tb, dtr, dell, h1)
+    pl0 = alpha2power(alfl, f0, dtr)
+    plr = alpha2power(alflr, fr, dtr)
+
+    p2 = pr + p0 + pl0 + plr
+    p1 = np.where(k == 1,
+                  alpha2power(number_Alfa(nu_plane, l), fp, dtr) + alpha2power(alfl, fp, dtr),
+                  p2)
+
+    alff = (p1 + p2)/(l*b*dtr)
+    bet = fp/(4*n*dks**2) * f1xy_array(l, b, n, alff, dks)
+    pp = alpha2power(alff, fp, dtr)/bet
+
+    res = {'pr': pr, 'p0': p0, 'pl0': pl0, 'plr': plr, 'alff': alff, 'bet': bet, 'pp': pp}
+    if tracing.tracer is not None:
+        tracing.tracer('RRE.cooling_power_array', res)
+    return res
+
+
+def select(data):
+    """
+    param:
+        data : dict
+            Параметры расчёта в формате utils.csv_parser
+
+    Подбирает радиатор под набор элементов из data. Возвращает dict с параметрами
+    радиатора (length, width, fin_height, area), отводимой мощностью pp и
+    суммарной мощностью элементов power, либо None, если в заданных
+    геометрических рамках радиатор подобрать невозможно.
+    """
     gather_elements = SetElectronicElements()
 
-    filename = 'input_data'
-    data = utils.csv_parser(filename)
     tb, h1, lm, bm, k, s = data['conditions']
 
     for el in data['elements']:
@@ -251,16 +358,28 @@ def main():
 
     conditions = {'tb': tb, 'dtr': dtr, 'n':n, 'fr1': fr1, 'k': k, 'dks': dks, 's': s}
 
-    for el in radiator_generator(k, length=lm, max_width=bm):
-        l, b = el
-        radiator = FinnedRadiator(l, b, h1)
-        pp = cooling_power(radiator, **conditions)
+    def capacity(l, b):
+        return cooling_power(FinnedRadiator(l, b, h1), **conditions)
+
+    radiators = radiator_generator(k, length=lm, max_width=bm)
+    selected = select_radiator(radiators, capacity, p)
+    if selected is None:
+        return None
 
-        if pp >= p:
-            print("Параметры радиатора: длина {0}, ширина {1}, выота ребра {2}, площадь {3}".format(l,b,h1, l*b))
-            break
+    index, pp = selected
+    l, b = radiators[index]
+    return {'length': l, 'width': b, 'fin_height': h1, 'area': l*b, 'pp': pp, 'power': p}
 
-    if pp < p:
+
+def main():
+    filename = 'input_data'
+    data = utils.csv_parser(filename)
+    res = select(data)
+
+    if res is not None:
+        print("Параметры радиатора: длина {0}, ширина {1}, выота ребра {2}, площадь {3}".format(
+            res['length'], res['width'], res['fin_height'], res['area']))
+    else:
         print('Невозможно подобрать радиатор в заданных геометрических рамках')
 
 
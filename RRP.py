@@ -9,15 +9,23 @@
 
 #-------------------------------------------------------------------------------
 import math
+import numpy as np
 import utils
+import tracing
 
-from RRE import f1xy, alpha2power
+from RRE import f1xy, f1xy_array, alpha2power
 from radiators import FinnedRadiator
 from elements import ElectronicElement, SetElectronicElements
 from radiators import fin_radiator_generator as radiator_generator
+from radiators import select_radiator
 from utils import get_real
 
 
+WIDEN = 20      # Количество удвоений верхней границы вилки в cooling_power_consistent
+
+HEAT_BALANCE_KEYS = ('pr', 'dtr', 'wr', 'p0', 'pl0', 'plr', 'p1', 'p2', 'alff', 'bet', 'pp')
+
+
 def reynolds(w, d):
     """
     param:
@@ -129,32 +137,20 @@ def number_Alfa(nu, l, t=50):
 
 
 
-def cooling_power(radiator, tb, dtr, n, fr1, k, dks, w, p):
+def heat_balance(radiator, tb, dtr, n, fr1, k, dks, w, pr):
     """
     param:
-        radiator : FinnedRadiator()
-            Экземпляр класса радиатора.
-        tb : float
-            Температура окружающей среды [*C]
-        dtr : float
-            Максимально допустимая разница температур [*C]
-        n : integer
-            Количество установленных элементов
-        fr1 : float
-            Площадь изымаемых боковых поверхностей [м^2]
-        k : integer
-            Одно- или двусторонний радиатор
-        dks : float
-            Магическая переменная
-        w : float
-            Скорость потока среды [м/с]
-        p : float
-            Суммарная тепловая мощность элементов [Вт]
-
-    Расчёт мощности [Вт] отводимой радиатором в данных условиях
+        radiator, tb, dtr, n, fr1, k, dks, w:
+            См. cooling_power
+        pr : float
+            Мощность, отводимая конвекцией с боковой поверхности рёбер [Вт]
+
+    Тепловой баланс радиатора при заданной мощности рёбер pr. Перегрев
+    пересчитывается по мощности рёбер, остальные составляющие считаются
+    при этом перегреве. Возвращает dict: pr, dtr (пересчитанный перегрев), wr,
+    p0, pl0, plr, p1, p2 (мощности плоской и оребрённой стороны), alff, bet и
+    pp - мощность, отводимую при допустимом перегреве.
     """
-
-    pr = p*0.7
     l = radiator.length
     h1 = radiator.fin_height
     b = radiator.width
@@ -202,18 +198,321 @@ def cooling_power(radiator, tb, dtr, n, fr1, k, dks, w, p):
 
     bet = fp/(4*n*dks**2) * f1xy(l, b, n, alff, dks)      # Какой-то коэффициент растекания
     pp = alpha2power(alff, fp, dtoop) / bet
-    print("PP : {0}; alff : {1}, w : {2}, wr : {3}".format(pp, alff, w, wr))
-    return pp
+    return {'pr': pr, 'dtr': dtr, 'wr': wr, 'p0': p0, 'pl0': pl0, 'plr': plr, 'p1': p1, 'p2': p2,
+            'alff': alff, 'bet': bet, 'pp': pp}
 
 
-def main():
+def cooling_power(radiator, tb, dtr, n, fr1, k, dks, w, p):
+    """
+    param:
+        radiator : FinnedRadiator()
+            Экземпляр класса радиатора.
+        tb : float
+            Температура окружающей среды [*C]
+        dtr : float
+            Максимально допустимая разница температур [*C]
+        n : integer
+            Количество установленных элементов
+        fr1 : float
+            Площадь изымаемых боковых поверхностей [м^2]
+        k : integer
+            Одно- или двусторонний радиатор
+        dks : float
+            Магическая переменная
+        w : float
+            Скорость потока среды [м/с]
+        p : float
+            Суммарная тепловая мощность элементов [Вт]
 
-    w = get_real("Скорость потока среды, м/с", default = 1)       # Единственный новый параметр
+    Расчёт мощности [Вт] отводимой радиатором в данных условиях
+    """
+    res = heat_balance(radiator, tb, dtr, n, fr1, k, dks, w, p*0.7)
+    if tracing.tracer is not None:
+        tracing.tracer('RRP.cooling_power', dict(res, w=w))
+    return res['pp']
+
+
+def cooling_power_consistent(radiator, tb, dtr, n, fr1, k, dks, w, p, tol=1E-6, maxiter=50):
+    """
+    param:
+        radiator, tb, dtr, n, fr1, k, dks, w, p:
+            См. cooling_power
+        tol : float
+            Допустимая относительная невязка баланса мощностей
+        maxiter : integer
+            Максимальное количество итераций
+
+    Расчёт мощности [Вт] с согласованным распределением мощности между рёбрами
+    и остальной поверхностью. Вместо принятой в cooling_power доли рёбер 70 %
+    мощность рёбер pr подбирается так, чтобы радиатор при пересчитанном
+    перегреве отводил ровно p: p1(pr) + p2(pr) = p. Невязка монотонно растёт
+    с pr и меняет знак на (0, p], корень ищется методом хорд с модификацией
+    Illinois (сходимость сверхлинейная, корень всё время в вилке). Если при
+    pr = p невязка ещё отрицательна, верхняя граница удваивается (до WIDEN
+    раз); если вилку получить не удалось, итерации не выполняются и
+    converged = False. Для радиатора без рёбер (fr <= 0) все величины - nan.
+
+    Возвращает dict heat_balance, дополненный iterations и converged.
+
+    >>> rad = FinnedRadiator(0.1, 0.1, 0.02)
+    >>> res = cooling_power_consistent(rad, 25, 40, 2, 0.001, 1, 0.008, 1, 30)
+    >>> res['converged'], res['iterations'] < 15
+    (True, True)
+    >>> abs(res['p1'] + res['p2'] - 30) < 30 * 1E-6
+    True
+    >>> res = cooling_power_consistent(rad, 25, 40, 2, 1, 1, 0.008, 1, 30)
+    >>> math.isnan(res['pp']), res['converged']
+    (True, False)
+    """
+    def balance(pr):
+        res = heat_balance(radiator, tb, dtr, n, fr1, k, dks, w, pr)
+        return res, res['p1'] + res['p2'] - p
+
+    if radiator.fins_surface_with_element(fr1) <= 0:
+        res = dict.fromkeys(HEAT_BALANCE_KEYS, math.nan)
+        res.update(iterations=0, converged=False)
+        if tracing.tracer is not None:
+            tracing.tracer('RRP.cooling_power_consistent', dict(res, w=w))
+        return res
+
+    a, b = p * 1E-6, p
+    (_, fa), (res, fb) = balance(a), balance(b)
+    for _ in range(WIDEN):
+        if not fa * fb > 0 or fb > 0:
+            break
+        a, fa = b, fb
+        b *= 2
+        res, fb = balance(b)
+    iterations, converged = 0, abs(fb) <= tol * p
+    if not converged and not fa * fb <= 0:
+        # Корень не в вилке (или невязка не определена): без вилки метод хорд
+        # может уйти за физические пределы
+        maxiter = 0
+    while not converged and iterations < maxiter:
+        c = (a * fb - b * fa) / (fb - fa)
+        res, fc = balance(c)
+        iterations += 1
+        if fc * fb < 0:
+            a, fa = b, fb
+        else:
+            fa /= 2
+        b, fb = c, fc
+        converged = abs(fb) <= tol * p
+
+    res = dict(res, iterations=iterations, converged=converged)
+    if tracing.tracer is not None:
+        tracing.tracer('RRP.cooling_power_consistent', dict(res, w=w))
+    return res
+
+
+def cooling_power_array(length, width, fin_height, tb, dtr, n, fr1, k, dks, w, p,
+                        step=10E-3, fin_thick=1E-3, base_thick=4E-3, pr=None):
+    """
+    param:
+        length, width, fin_height, step, fin_thick, base_thick : array_like
+            Геометрия радиаторов (см. FinnedRadiator) [м]
+        tb, dtr, n, fr1, k, dks, w, p : array_like
+            Условия расчёта, как в cooling_power
+        pr : array_like
+            Мощность рёбер [Вт] (по умолчанию 0.7*p, как в cooling_power)
+
+    Пакетный расчёт мощности [Вт], отводимой радиаторами при принудительной
+    конвекции. Параметры приводятся друг к другу по правилам broadcasting numpy.
+    Режимы течения из nusselt_force_fins и nusselt_force_plane выбираются
+    поэлементно через np.select/np.where, поправка nki берётся линейной
+    интерполяцией (за пределами таблицы - крайнее значение).
+    Там, где рёбра полностью срезаны выборкой (fr <= 0), pp = nan.
+
+    Возвращает dict массивов: pr, p0, pl0, plr, p1, p2, alff, bet, pp и dtr
+    (перегрев, пересчитанный по мощности рёбер).
+
+    >>> res = cooling_power_array(0.1, 0.1, 0.02, 25, 40, 2, 0.001, 1, 0.008, [1, 2], 30)
+    >>> res['pp'].shape
+    (2,)
+    >>> both = cooling_power_array(0.1, 0.1, 0.02, 25, 40, 2, 0.001, [1, 2], 0.008, 1, 30)['pp']
+    >>> one = [cooling_power_array(0.1, 0.1, 0.02, 25, 40, 2, 0.001, k, 0.008, 1, 30)['pp'] for k in (1, 2)]
+    >>> bool(np.allclose(both, one))
+    True
+    """
+    l, b, h1, step, fin_thick, base_thick, tb, dtr, n, fr1, k, dks, w, p = (
+        np.asarray(x, dtype=float) for x in (length, width, fin_height, step, fin_thick, base_thick,
+                                             tb, dtr, n, fr1, k, dks, w, p))
+
+    nz = np.floor_divide(b - fin_thick, step) + 1
+    dell = (step - fin_thick) / 2
+    fr = np.maximum((nz - 1) * (l * h1 * 2) - fr1, 0)
+    f0 = l * b + 2 * h1 * l + 2 * base_thick * (l + b) + 2 * nz * h1 * fin_thick
+    fp = l * b
+    dk = 4 * (2 * dell * h1) / (2 * (h1 + 2 * dell))
+    q = l/dk
+
+    pr = np.multiply(p, 0.7) if pr is None else np.asarray(pr, dtype=float)
+    wr = w * step / (step - fin_thick)
+
+    # nusselt_force_fins
+    rer = reynolds(wr, dk)
+    a = 0.7*rer/q
+    nu_lam = np.select([a <= 5, a <= 100], [9, 8.4*a**0.045], 2.32*a**0.33)
+    fl = np.where(q <= 50, np.interp(q, [1, 2, 5, 10, 15, 20, 30, 40, 50],
+                                     [1.9, 1.7, 1.44, 1.28, 1.18, 1.13, 1.05, 1.02, 1]), 1)
+    nur = np.where(rer <= 2200, nu_lam, fl*0.0216*rer**0.8)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alfr = number_Alfa(nur, dk)
+        dtb = (0.9E-3 * pr)/(w * (2 * dell * h1))
+        dtrr = pr / (alfr * fr)
+        mh1 = 0.15 * np.sqrt(alfr / fin_thick) * h1
+        z = np.tanh(mh1)/mh1
+        dtr_r = dtrr/z + dtb/2
+
+        # nusselt_force_plane
+        re = reynolds(w, l)
+        nu_plane = np.where(re >= 1E5, 0.084*re**0.8, 0.792*re**0.5)
+        p0 = alpha2power(number_Alfa(nu_plane, l), f0, dtr_r)
+
+        alfl, alflr = number_Alfa_radiation(tb, dtr_r, dell, h1)
+        plr = alpha2power(alflr, fr, dtr_r)
+        pl0 = alpha2power(alfl, f0, dtr_r)
+
+        p2 = pr + p0 + pl0 + plr
+        p1 = np.where(k == 1,
+                      alpha2power(number_Alfa(nu_plane, l), fp, dtr_r) + alpha2power(alfl, fp, dtr_r),
+                      p2)
+
+        alff = (p1 + p2)/(fp*dtr_r)
+        bet = fp/(4*n*dks**2) * f1xy_array(l, b, n, alff, dks)
+        pp = np.where(fr > 0, alpha2power(alff, fp, dtr) / bet, np.nan)
+
+    res = {'pr': pr, 'p0': p0, 'pl0': pl0, 'plr': plr, 'p1': p1, 'p2': p2, 'alff': alff,
+           'bet': bet, 'pp': pp, 'dtr': dtr_r}
+    if tracing.tracer is not None:
+        tracing.tracer('RRP.cooling_power_array', res)
+    return res
+
+
+def cooling_power_consistent_array(length, width, fin_height, tb, dtr, n, fr1, k, dks, w, p,
+                                   step=10E-3, fin_thick=1E-3, base_thick=4E-3,
+                                   tol=1E-6, maxiter=50):
+    """
+    param:
+        length, width, fin_height, step, fin_thick, base_thick, tb, dtr, n, fr1, k, dks, w, p:
+            См. cooling_power_array
+        tol, maxiter:
+            См. cooling_power_consistent
+
+    Пакетный вариант cooling_power_consistent: метод хорд Illinois ведётся
+    одновременно для всех радиаторов, на каждой итерации пересчитываются только
+    ещё не сошедшиеся. Вилка расширяется, как в cooling_power_consistent;
+    радиаторы без вилки и без рёбер (fr <= 0) исключаются сразу
+    (converged = False).
+
+    Возвращает dict массивов, как cooling_power_array, дополненный
+    iterations и converged.
+
+    >>> res = cooling_power_consistent_array([0.1, 0.125], [0.1, 0.152], 0.02, 25, 40, 2, 0.001, 1, 0.008, 1, 30)
+    >>> [bool(c) for c in res['converged']]
+    [True, True]
+    >>> rad = FinnedRadiator(0.1, 0.1, 0.02)
+    >>> pp = cooling_power_consistent(rad, 25, 40, 2, 0.001, 1, 0.008, 1, 30)['pp']
+    >>> bool(abs(res['pp'][0] - pp) < 1E-6 * pp)
+    True
+    """
+    args = np.broadcast_arrays(*(np.asarray(arg, dtype=float) for arg in
+                                 (length, width, fin_height, tb, dtr, n, fr1, k, dks, w, p,
+                                  step, fin_thick, base_thick)))
+    shape = args[0].shape
+    args = [arg.ravel() for arg in args]
+    p = args[10]
+
+    def balance(pr, idx):
+        res = cooling_power_array(*(arg[idx] for arg in args[:11]), step=args[11][idx],
+                                  fin_thick=args[12][idx], base_thick=args[13][idx], pr=pr)
+        return res, res['p1'] + res['p2'] - p[idx]
+
+    a, b = p * 1E-6, p.copy()
+    _, fa = balance(a, slice(None))
+    res, fb = balance(b, slice(None))
+    res = {key: np.array(np.broadcast_to(val, p.shape)) for key, val in res.items()}
+
+    # Расширение вилки вверх, пока невязка на обоих концах отрицательна
+    for _ in range(WIDEN):
+        widen = np.flatnonzero((fa < 0) & (fb < 0))
+        if not len(widen):
+            break
+        a[widen], fa[widen] = b[widen], fb[widen]
+        b[widen] *= 2
+        step_res, fb[widen] = balance(b[widen], widen)
+        for key, val in step_res.items():
+            res[key][widen] = val
+
+    iterations = np.zeros(p.shape, dtype=int)
+    converged = np.abs(fb) <= tol * p
+    active = np.flatnonzero(~converged & (fa * fb <= 0))
+
+    while len(active) and iterations[active[0]] < maxiter:
+        ai, bi, fai, fbi = a[active], b[active], fa[active], fb[active]
+        c = (ai * fbi - bi * fai) / (fbi - fai)
+        step_res, fc = balance(c, active)
+        keep = fc * fbi >= 0
+        a[active] = np.where(keep, ai, bi)
+        fa[active] = np.where(keep, fai / 2, fbi)
+        b[active], fb[active] = c, fc
+        for key, val in step_res.items():
+            res[key][active] = val
+        iterations[active] += 1
+        done = np.abs(fc) <= tol * p[active]
+        converged[active] = done
+        active = active[~done & np.isfinite(fc)]
+
+    res = {key: val.reshape(shape) for key, val in res.items()}
+    res.update(iterations=iterations.reshape(shape), converged=converged.reshape(shape))
+    if tracing.tracer is not None:
+        tracing.tracer('RRP.cooling_power_consistent_array', res)
+    return res
+
+
+def cooling_power_grid(length, width, fin_height, w, **conditions):
+    """
+    param:
+        length, width : array_like
+            Длины и ширины радиаторов (например, из fin_radiator_generator) [м]
+        fin_height : float
+            Высота рёбер [м]
+        w : array_like
+            Скорости потока среды [м/с]
+        conditions:
+            Остальные параметры cooling_power_array
+
+    Расчёт на сетке (геометрия x скорость). Возвращает dict массивов формы
+    (len(length), len(w)).
+
+    >>> res = cooling_power_grid([0.1, 0.125], [0.1, 0.152], 0.02, [0.5, 1, 2], tb=25, dtr=40, n=2, fr1=0.001, k=1, dks=0.008, p=30)
+    >>> res['pp'].shape
+    (2, 3)
+    """
+    l = np.asarray(length, dtype=float)[:, np.newaxis]
+    b = np.asarray(width, dtype=float)[:, np.newaxis]
+    w = np.asarray(w, dtype=float)[np.newaxis, :]
+    res = cooling_power_array(l, b, fin_height, w=w, **conditions)
+    shape = np.broadcast_shapes(l.shape, w.shape)
+    return {key: np.broadcast_to(val, shape) for key, val in res.items()}
+
+
+def select(data, w):
+    """
+    param:
+        data : dict
+            Параметры расчёта в формате utils.csv_parser
+        w : float
+            Скорость потока среды [м/с]
 
+    Подбирает радиатор под набор элементов из data. Возвращает dict с параметрами
+    радиатора (length, width, fin_height, area), отводимой мощностью pp и
+    суммарной мощностью элементов power, либо None, если в заданных
+    геометрических рамках радиатор подобрать невозможно.
+    """
     gather_elements = SetElectronicElements()
 
-    filename = 'test_RRP_input_data.csv'
-    data = utils.csv_parser(filename)
     tb, h1, lm, bm, k, s = data['conditions']
 
     for el in data['elements']:
@@ -230,16 +529,30 @@ def main():
 
     conditions = {'tb': tb, 'dtr': dtr, 'n': n, 'fr1': fr1, 'k': k, 'dks': dks, 'w': w, 'p': p}
 
-    for el in radiator_generator(k, length=lm, max_width=bm):
-        l, b = el
-        radiator = FinnedRadiator(l, b, h1, step=s)
-        pp = cooling_power(radiator, **conditions)
+    def capacity(l, b):
+        return cooling_power(FinnedRadiator(l, b, h1, step=s), **conditions)
 
-        if pp >= p:
-            print("Параметры радиатора: длина {0}, ширина {1}, выота ребра {2}, площадь {3}".format(l,b,h1, l*b))
-            break
+    radiators = radiator_generator(k, length=lm, max_width=bm)
+    selected = select_radiator(radiators, capacity, p, monotone=False)
+    if selected is None:
+        return None
+
+    index, pp = selected
+    l, b = radiators[index]
+    return {'length': l, 'width': b, 'fin_height': h1, 'area': l*b, 'pp': pp, 'power': p}
 
-    if pp < p:
+
+def main():
+    w = get_real("Скорость потока среды, м/с", default = 1)       # Единственный новый параметр
+
+    filename = 'test_RRP_input_data.csv'
+    data = utils.csv_parser(filename)
+    res = select(data, w)
+
+    if res is not None:
+        print("Параметры радиатора: длина {0}, ширина {1}, выота ребра {2}, площадь {3}".format(
+            res['length'], res['width'], res['fin_height'], res['area']))
+    else:
         print('Невозможно подобрать радиатор в заданных геометрических рамках')
 
 
@@ -9,29 +9,14 @@
 # Copyright:   (c) G.Ukryukov 2019
 # Licence:     <your licence>
 #-------------------------------------------------------------------------------
+import numpy as np
+import utils
+import tracing
+
+from radiators import PinRadiator
+from radiators import pin_radiator_generator as radiator_generator
+from elements import ElectronicElement, SetElectronicElements
 
-def get_real(message, name="real",default=None):
-    """
-    Запрашивает у пользователя ввод параметра i, оповещая сообщением message
-    Использует по умолчанию значение default. Возвращает Real.
-    """
-    class RangeError(Exception): pass
-    message += ": " if default is None else " [{0}]: ".format(default)
-    while True:
-        try:
-            line = input(message)
-            if not line and default is not None:
-                return default
-            i = float(line)
-            if i >= 0:
-                return i
-            else:
-                raise RangeError("{0} may not be 0".format(name))
-            return i
-        except RangeError as err:
-            print("ERROR", err)
-        except ValueError as err:
-            print("ERROR {0} must be an real".format(name))
 
 def number_Gr(t, dt_max, l):
     """
@@ -68,104 +53,194 @@ def number_Alfa(nu, l, t = 50):
     alfa = 0.0283 * nu/l
     return alfa
 
-def main():
-    L1 = [0.036, 0.036, 0.05, 0.05, 0.05, 0.08, 0.08, 0.08, 0.1, 0.1, 0.1,
-            0.125, 0.125, 0.125]
-    L2 = [0.05, 0.05, 0.05, 0.08, 0.08, 0.08, 0.1, 0.1, 0.1, 0.125, 0.125,
-            0.125, 0.125, 0.125]
-    B1 = [0.032, 0.072, 0.032, 0.052, 0.092, 0.032, 0.072, 0.122, 0.052, 0.092,
-            0.152, 0.072, 0.122, 0.152]
-    B2 = [0.032, 0.052, 0.092, 0.032, 0.072, 0.122, 0.152, 0.092, 0.152, 0.072,
-            0.122, 0.152, 0.152, 0.152]
-    SV = [4, 8, 15, 23, 34, 50]
-
-    tb = get_real("Введите температуру воздуха, °C", default = 40)
-    h1 = get_real("введите высоту ребра, м", default = 0.0125)
-    lm = get_real("максимально допустимая высота радиатора, м", default = 1.125)
-    bm = get_real("максимально допустимая ширина радиатора, м", default = 1.152)
-    k = get_real("Односторонний или двусторонний радиатор (1/2) ", default = 1)
-    n = int(get_real("Количество ППП, установленных на радиаторе", default = 1))
-    k1 = get_real("Имеется ли выборка (0/1)", default = 0)
-
-    pi = list()
-    k2 = list(); kkr = list(); tdop = list(); s0 = list()
-    for i in range(n):
-        temp = get_real("Мощность элемента {0}, Вт".format(i), default = 15)
-        pi.append(temp)
-        temp = get_real("Максимально допустимая температура элемента {0}, °С".format(i), default = 70)
-        tdop.append(temp)
-        temp = get_real("Площадь контакта элемента {0}, м2".format(i), default = 0.013)
-        s0.append(temp)
-        temp = get_real("Удельное контактное тепловое сопротивление элемента {0} м2*К/Вт".format(i), default = 0.76E-4)
-        kkr.append(temp)
-        temp = get_real("Признак выборки под ППП {0} (1..6)".format(i), default = 5)
-        k2.append(temp)
-
-    s = 0.007
-    d = 0.003
-    dks = math.sqrt(s0[0]/3.14)  #почему? Иди нахуй. вот почему.
-    p = 0
-    dtr = 1000    # допустимый перегрев
-    fs1 = 0
-
-    for i in range(n):
-        kk = k2[i]              # здесь хранится номер выборки i-того элемента
-        p += pi[i]            # здесь собираем суммарную мощность ППП
-        fs1 += 3.14 * d * SV[kk] * h1 * k1     # боковая поверхность штырей, изымаемая при выборке
-        tdop[i] -= tb - pi[i] * kkr[i] / s0[i]  # расчёт допустимого перегрева (минимального)
-        if tdop[i] <= dtr:                      #  --//--
-            dtr = tdop[i]                       #  --//--
-
-    for i in range(len(L1)):
-# Здесь подбирается радиатор из сетки размеров для одной и двх сторон
-        if k == 1:
-            l = L1[i]
-            b = B1[i]
-        else:
-            l = L2[i]
-            b = B2[i]
-# Если радиатор из списка больше допустимого размера, значит подборки нет
-    if (l > lm) or (b > bm):
-        print("Финита ля комедия. Радиаторов не существует. Это фантастика")
-        break
-
-    n1 = (l - 0.008)/s + 1
-    n2 = (b - 0.008)/s + 1
-    nz = n1 * n2
-
-    fp = l * b
-#    gpr = number_Gr(tb, dtr, l)
-    nu_plane = number_Nu_plane(tb, dtr, l)
-    alfp = number_Alfa(nu_plane, l)
-
-    fs = 3.14 * d * h1 * nz - fs1
-    if fs < 0:
-        fs = 0
-
-    pp = alfp * fp * dtr
-    a4 = (d / s) ** 1.7
-    a1 = 1.83E-6 * a4 * (5.7 + 0.22* n1) / d
+
+def pin_flow(radiator, tb, dtr, fs, dtv):
+    """
+    param:
+        radiator : PinRadiator()
+            Экземпляр класса штыревого радиатора
+        tb : float
+            Температура окружающей среды [*C]
+        dtr : float
+            Допустимый перегрев основания радиатора [*C]
+        fs : float
+            Площадь боковой поверхности штырей за вычетом выборок [м^2]
+        dtv : float
+            Подогрев воздуха, проходящего между штырями [*C]
+
+    Тяговый баланс межштыревого пространства при подогреве воздуха на dtv.
+    Возвращает (dp - dh, ps, w): невязку между сопротивлением пучка штырей dp
+    и самотягой dh, мощность ps, отводимую штырями [Вт], и скорость воздуха w [м/с].
+    Все параметры могут быть массивами numpy.
+    """
+    d = radiator.pin_diam
+    n1 = radiator.rows_number()
+    a4 = (d / radiator.step) ** 1.7
+    a1 = 1.83E-6 * a4 * (5.7 + 0.22 * n1) / d     # сопротивление пучка штырей
     a2 = 0.11 * a4 * n1
-    fv = 1200 * h1 * b  # ???
-    dp = 0
-    dh = 0
-    dtv = dtr + 0.1
-    if dp > dh:
-        dtv = dtv +0.1
-    if dr <= dh:
-        dtv = dtv - 0.1
-
-    gr = number_Gr(tb, (dtr-dtv/2), d)
+    fv = 1200 * radiator.pin_height * radiator.width  # ???
+
+    gr = number_Gr(tb, (dtr - dtv/2), d)
     nus = 0.236 * gr ** 0.125
     alfs = number_Alfa(nus, d)
     ps = alfs * fs * (dtr - dtv/2)
     w = ps / (fv * dtv)
     dp = w * (a1 + a2 * w)
-    dh = 0.6 * l * dtv / (273 + tb + dtv/2)
-    a3 = (abs(dp - dh)/dh)
-    if a3 <= 0.1:
-        f0 = l * b - 0.785 * d ** 2 * nz
-        p0 = alfp * f0 * dtr
-        tr = tb + dtr
+    dh = 0.6 * radiator.length * dtv / (273 + tb + dtv/2)
+    return dp - dh, ps, w
+
+
+def cooling_power(radiator, tb, dtr, fs1, k, xtol=1E-6):
+    """
+    param:
+        radiator : PinRadiator()
+            Экземпляр класса штыревого радиатора
+        tb : float
+            Температура окружающей среды [*C]
+        dtr : float
+            Максимально допустимая разница температур [*C]
+        fs1 : float
+            Площадь боковой поверхности штырей, изымаемая выборками [м^2]
+        k : integer
+            Одно- или двусторонний радиатор
+        xtol : float
+            Точность определения подогрева воздуха dtv [*C]
+
+    Расчёт мощности [Вт], отводимой штыревым радиатором в данных условиях.
+    Подогрев воздуха между штырями dtv находится из равенства сопротивления
+    пучка и самотяги (pin_flow) методом Брента на отрезке (0, 2*dtr]: при малом
+    подогреве сопротивление больше тяги, при dtv = 2*dtr штыри тепла не отдают.
+
+    >>> rad = PinRadiator(0.05, 0.052, 0.0125)
+    >>> round(cooling_power(rad, 40, 40, 0, 1), 2)
+    3.6
+    """
+    fp = radiator.flat_surface()
+    fs = max(radiator.pins_surface() - fs1, 0)
+
+    alfp = number_Alfa(number_Nu_plane(tb, dtr, radiator.length), radiator.length)
+
+    if fs > 0:
+        dtv = utils.brent_root(lambda x: pin_flow(radiator, tb, dtr, fs, x)[0],
+                               dtr * 1E-9, 2 * dtr, xtol=xtol)
+        _, ps, w = pin_flow(radiator, tb, dtr, fs, dtv)
+    else:
+        dtv = ps = w = 0
+
+    p0 = alfp * radiator.base_surface() * dtr       # Конвекция с основания между штырями
+    tr = tb + dtr
+    alfl = 4.5E-8 * ((tr + 273)**4 - (tb + 273)**4)/dtr
+    pl = alfl * fp * dtr                            # Излучение со штыревой стороны
+
+    p2 = ps + p0 + pl
+    if k == 1:
+        p1 = alfp * fp * dtr + alfl * fp * dtr     # Плоская сторона: конвекция + излучение
+    else:
+        p1 = p2
+    pp = p1 + p2
+
+    if tracing.tracer is not None:
+        tracing.tracer('RSE.cooling_power', {'pp': pp, 'ps': ps, 'p0': p0, 'pl': pl, 'dtv': dtv,
+                                             'w': w})
+    return pp
+
+
+def cooling_power_array(length, width, pin_height, tb, dtr, fs1, k, step=7E-3, pin_diam=3E-3,
+                        xtol=1E-6):
+    """
+    param:
+        length, width, pin_height, step, pin_diam : array_like
+            Геометрия штыревых радиаторов (см. PinRadiator) [м]
+        tb, dtr, fs1, k : array_like
+            Условия расчёта, как в cooling_power
+
+    Пакетный расчёт мощности штыревых радиаторов. Тяговый баланс решается
+    делением пополам сразу для всех радиаторов. Возвращает dict массивов
+    ps, p0, pl, dtv, w и pp.
+
+    >>> res = cooling_power_array([0.05, 0.1], [0.052, 0.092], 0.0125, 40, 40, 0, 1)
+    >>> round(float(res['pp'][0]), 2)
+    3.6
+    """
+    radiator = PinRadiator(np.asarray(length, dtype=float), np.asarray(width, dtype=float),
+                           np.asarray(pin_height, dtype=float), step, pin_diam)
+    fp = radiator.flat_surface()
+    fs = np.maximum(radiator.pins_surface() - fs1, 0)
+
+    a = 0.7 * number_Gr(tb, dtr, radiator.length)
+    nu_plane = np.select([a <= 5E2, a <= 2E7], [1.18 * a ** 0.125, 0.54 * a ** 0.25], 0.135 * a ** 0.33)
+    alfp = number_Alfa(nu_plane, radiator.length)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dtv = utils.bisect_root_array(lambda x: pin_flow(radiator, tb, dtr, fs, x)[0],
+                                      np.multiply(dtr, 1E-9), np.multiply(dtr, 2), xtol=xtol)
+        _, ps, w = pin_flow(radiator, tb, dtr, fs, dtv)
+    ps = np.where(fs > 0, ps, 0)
+
+    p0 = alfp * radiator.base_surface() * dtr
+    tr = tb + dtr
+    alfl = 4.5E-8 * ((tr + 273)**4 - (tb + 273)**4)/dtr
+    pl = alfl * fp * dtr
+
+    p2 = ps + p0 + pl
+    p1 = np.where(np.equal(k, 1), alfp * fp * dtr + alfl * fp * dtr, p2)
+    res = {'ps': ps, 'p0': p0, 'pl': pl, 'dtv': dtv, 'w': w, 'pp': p1 + p2}
+    if tracing.tracer is not None:
+        tracing.tracer('RSE.cooling_power_array', res)
+    return res
+
+
+def select(data):
+    """
+    param:
+        data : dict
+            Параметры расчёта в формате utils.csv_parser
+
+    Подбирает штыревой радиатор из каталога (k = 1 или 2) под набор элементов
+    из data: все радиаторы каталога, помещающиеся в заданные габариты,
+    считаются одним вызовом cooling_power_array, выбирается первый подходящий.
+    Возвращает dict, как RRE.select, либо None.
+    """
+    gather_elements = SetElectronicElements()
+
+    tb, h1, lm, bm, k = data['conditions'][:5]
+
+    for el in data['elements']:
+        element = ElectronicElement(*el)
+        gather_elements.add(element)
+
+    fs1 = gather_elements.fs1_full_exclude_surface(h1)
+    dtr = gather_elements.dtr_permissible_overheating(tb)
+    p = gather_elements.full_power()
+
+    catalog = np.array(radiator_generator(1 if k == 1 else 2))
+    catalog = catalog[(catalog[:, 0] <= lm) & (catalog[:, 1] <= bm)]
+    if dtr <= 0 or len(catalog) == 0:
+        return None
+
+    pp = cooling_power_array(catalog[:, 0], catalog[:, 1], h1, tb, dtr, fs1, k)['pp']
+    found = np.flatnonzero(pp >= p)
+    if len(found) == 0:
+        return None
+
+    i = found[0]
+    l, b = float(catalog[i, 0]), float(catalog[i, 1])
+    return {'length': l, 'width': b, 'fin_height': h1, 'area': l*b, 'pp': float(pp[i]), 'power': p}
+
+
+def main():
+    filename = 'input_data'
+    data = utils.csv_parser(filename)
+    res = select(data)
+
+    if res is not None:
+        print("Параметры радиатора: длина {0}, ширина {1}, высота штыря {2}, площадь {3}".format(
+            res['length'], res['width'], res['fin_height'], res['area']))
+    else:
+        print('Невозможно подобрать радиатор в заданных геометрических рамках')
+
+
 if __name__ == '__main__':
     main()
+    import doctest
+    doctest.testmod()
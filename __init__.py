@@ -2,4 +2,19 @@ from . import utils
 from . import radiators
 from . import elements
 from . import RRE
-from . import RRP
\ No newline at end of file
+from . import RRP
+from . import optimizer
+from . import batch
+from . import cache
+from . import tables
+from . import tracing
+from . import RSE
+from . import derating
+from . import tolerance
+from . import sweep
+from . import plate
+from . import placement
+from . import partition
+from . import service
+from . import frontend
+from . import store
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        batch
+# Purpose:     Пакетный подбор радиаторов по множеству input файлов
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import utils
+import RRE
+import RRP
+from cache import ResultCache, cached_select
+
+
+_caches = {}    # Открытые в процессе кэши по каталогам
+
+
+def load_cases(source):
+    """
+    param:
+        source : string
+            Каталог с input файлами (.csv) или файл-манифест со списком путей
+            (по одному в строке; пустые строки и строки с '#' пропускаются,
+            относительные пути считаются от каталога манифеста)
+
+    Возвращает список путей к input файлам. Файлы каталога сортируются по имени,
+    порядок манифеста сохраняется.
+    """
+    if os.path.isdir(source):
+        names = sorted(name for name in os.listdir(source) if name.endswith('.csv'))
+        return [os.path.join(source, name) for name in names]
+
+    base = os.path.dirname(source)
+    with open(source, "r") as f_obj:
+        lines = [line.strip() for line in f_obj]
+    return [os.path.join(base, line) for line in lines if line and not line.startswith('#')]
+
+
+def run_case(path, mode='RRE', w=1, cache_dir=None):
+    """
+    param:
+        path : string
+            Путь к input файлу
+        mode : string
+            'RRE' - естественная конвекция, 'RRP' - принудительная
+        w : float
+            Скорость потока среды для RRP [м/с]
+        cache_dir : string
+            Каталог кэша результатов (см. cache.ResultCache). None - без кэша
+
+    Подбирает радиатор для одного input файла. Ошибки не пробрасываются,
+    а возвращаются в записи результата, чтобы не прерывать весь пакет.
+    Возвращает dict: case, status ('ok', 'not_found' или 'error') и
+    параметры радиатора из RRE.select/RRP.select либо error.
+    """
+    record = {'case': path}
+    try:
+        data = utils.csv_parser(path)
+        if cache_dir is None:
+            res = RRE.select(data) if mode == 'RRE' else RRP.select(data, w)
+        else:
+            if cache_dir not in _caches:
+                _caches[cache_dir] = ResultCache(cache_dir)
+            res = cached_select(data, mode, w, _caches[cache_dir])
+    except Exception as err:
+        record.update(status='error', error='{0}: {1}'.format(type(err).__name__, err))
+        return record
+
+    if res is None:
+        record['status'] = 'not_found'
+    else:
+        record['status'] = 'ok'
+        record.update(res)
+    return record
+
+
+def run_batch(paths, mode='RRE', w=1, workers=None, chunksize=16, cache_dir=None):
+    """
+    param:
+        paths : list of string
+            Пути к input файлам
+        mode, w, cache_dir:
+            См. run_case
+        workers : integer
+            Количество процессов (по умолчанию os.cpu_count(); 1 - без пула)
+        chunksize : integer
+            Количество файлов, передаваемых процессу за раз
+
+    Обрабатывает input файлы на пуле процессов. Возвращает список записей
+    run_case в порядке paths.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [run_case(path, mode, w, cache_dir) for path in paths]
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(run_case, paths, [mode] * len(paths), [w] * len(paths),
+                             [cache_dir] * len(paths), chunksize=chunksize))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетный подбор радиаторов")
+    parser.add_argument('source', help="каталог с .csv файлами или файл-манифест")
+    parser.add_argument('--mode', choices=['RRE', 'RRP'], default='RRE',
+                        help="естественная (RRE) или принудительная (RRP) конвекция")
+    parser.add_argument('-w', type=float, default=1, help="скорость потока среды для RRP, м/с")
+    parser.add_argument('--workers', type=int, default=None, help="количество процессов")
+    parser.add_argument('--cache', default=None, metavar='DIR',
+                        help="каталог кэша результатов")
+    parser.add_argument('-o', '--output', default=None, help="файл результатов (JSON lines)")
+    args = parser.parse_args(argv)
+
+    records = run_batch(load_cases(args.source), args.mode, args.w, args.workers,
+                        cache_dir=args.cache)
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for record in records:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if args.output:
+            out.close()
+
+    return 1 if any(record['status'] == 'error' for record in records) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
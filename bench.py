@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        bench
+# Purpose:     Замеры скорости расчётных функций
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import argparse
+import atexit
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import utils
+import RRE
+import RRP
+import RSE
+from elements import ElectronicElement, SetElectronicElements
+from radiators import FinnedRadiator, PinRadiator
+from radiators import fin_radiator_generator as radiator_generator
+from radiators import pin_radiator_generator
+
+
+SEED = 20201214
+WORKLOADS = {}
+
+
+def workload(name):
+    """
+    Регистрирует функцию подготовки нагрузки. Функция получает random.Random
+    с фиксированным зерном и возвращает (callable без параметров, количество
+    расчётов за один вызов).
+    """
+    def register(setup):
+        WORKLOADS[name] = setup
+        return setup
+    return register
+
+
+def random_conditions(rng):
+    return {'tb': rng.uniform(0, 60), 'dtr': rng.uniform(10, 80), 'n': rng.randint(1, 6),
+            'fr1': rng.uniform(0, 0.004), 'dks': 0.008}
+
+
+def random_elements(rng, count, max_viborka=6):
+    return [[rng.uniform(1, 30), rng.uniform(80, 125), rng.uniform(1E-4, 1E-3), 7.6E-5,
+             rng.randint(0, max_viborka)] for _ in range(count)]
+
+
+@workload('RRE.cooling_power catalog')
+def rre_catalog(rng):
+    cases = [(FinnedRadiator(l, b, 0.02), random_conditions(rng), k)
+             for k in (1, 2) for l, b in radiator_generator(k) for _ in range(20)]
+
+    def run():
+        for radiator, conditions, k in cases:
+            RRE.cooling_power(radiator, k=k, s=0.01, **conditions)
+    return run, len(cases)
+
+
+@workload('RRP.cooling_power catalog')
+def rrp_catalog(rng):
+    cases = [(FinnedRadiator(l, b, 0.02, step=0.005), random_conditions(rng), k, rng.uniform(0.5, 5))
+             for k in (1, 2) for l, b in radiator_generator(k) for _ in range(20)]
+
+    def run():
+        for radiator, conditions, k, w in cases:
+            RRP.cooling_power(radiator, k=k, w=w, p=10, **conditions)
+    return run, len(cases)
+
+
+@workload('RSE.cooling_power catalog')
+def rse_catalog(rng):
+    cases = [(PinRadiator(l, b, 0.0125), random_conditions(rng), k)
+             for k in (1, 2) for l, b in pin_radiator_generator(k) for _ in range(10)]
+
+    def run():
+        for radiator, conditions, k in cases:
+            RSE.cooling_power(radiator, conditions['tb'], conditions['dtr'], 0, k)
+    return run, len(cases)
+
+
+@workload('RSE.cooling_power_array sweep')
+def rse_array(rng):
+    size = 50000
+    gen = np.random.default_rng(rng.randrange(2**32))
+    geometry = {'length': gen.uniform(0.03, 0.3, size), 'width': gen.uniform(0.03, 0.3, size),
+                'pin_height': gen.uniform(0.01, 0.05, size)}
+
+    def run():
+        RSE.cooling_power_array(**geometry, tb=25, dtr=40, fs1=0, k=1)
+    return run, size
+
+
+@workload('RRE.cooling_power_array sweep')
+def rre_array(rng):
+    size = 200000
+    gen = np.random.default_rng(rng.randrange(2**32))
+    geometry = {'length': gen.uniform(0.03, 0.3, size), 'width': gen.uniform(0.03, 0.3, size),
+                'fin_height': gen.uniform(0.01, 0.05, size)}
+
+    def run():
+        RRE.cooling_power_array(**geometry, tb=25, dtr=40, n=2, fr1=0.001, k=1, dks=0.008)
+    return run, size
+
+
+@workload('RRP.cooling_power_grid')
+def rrp_grid(rng):
+    catalog = np.array(radiator_generator(0, 0.1, 0.5, 0.001))
+    velocities = np.linspace(0.2, 10, 50)
+
+    def run():
+        RRP.cooling_power_grid(catalog[:, 0], catalog[:, 1], 0.02, velocities, tb=25, dtr=40,
+                               n=2, fr1=0.001, k=1, dks=0.008, p=30, step=0.005)
+    return run, catalog.shape[0] * len(velocities)
+
+
+@workload('RRP.cooling_power_consistent_array')
+def rrp_consistent(rng):
+    catalog = np.array(radiator_generator(0, 0.1, 0.5, 0.001))
+    velocities = np.linspace(0.2, 10, 50)[:, np.newaxis]
+
+    def run():
+        RRP.cooling_power_consistent_array(catalog[:, 0], catalog[:, 1], 0.02, 25, 40, 2, 0.001,
+                                           1, 0.008, velocities, 30, step=0.005)
+    return run, catalog.shape[0] * len(velocities)
+
+
+@workload('f1xy')
+def f1xy(rng):
+    args = [(rng.uniform(0.03, 0.3), rng.uniform(0.03, 0.3), rng.randint(1, 6),
+             rng.uniform(10, 200), 0.008) for _ in range(5000)]
+
+    def run():
+        for params in args:
+            RRE.f1xy(*params)
+    return run, len(args)
+
+
+def elements_file(rng, count):
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    atexit.register(os.remove, path)
+    with os.fdopen(fd, "w") as f_obj:
+        f_obj.write("0;25;0.02;0.125;0.152;1;2\n")
+        for i, el in enumerate(random_elements(rng, count), 1):
+            f_obj.write(";".join(str(v) for v in [i] + el) + ";\n")
+    return path
+
+
+@workload('csv_parser')
+def csv_parser(rng):
+    count = 20000
+    path = elements_file(rng, count)
+
+    def run():
+        utils.csv_parser(path)
+    return run, count
+
+
+@workload('iter_cases')
+def iter_cases(rng):
+    count = 20000
+    path = elements_file(rng, count)
+
+    def run():
+        for _ in utils.iter_cases(path):
+            pass
+    return run, count
+
+
+@workload('SetElectronicElements aggregates')
+def element_set(rng):
+    params = random_elements(rng, 5000)
+
+    def run():
+        pull = SetElectronicElements(*(ElectronicElement(*el) for el in params))
+        for tb in range(0, 60, 5):
+            pull.dtr_permissible_overheating(tb)
+            pull.fr1_full_exclude_surface(0.02)
+            pull.full_power()
+    return run, len(params)
+
+
+@workload('RRE.select custom sweep')
+def rre_select(rng):
+    cases = [{'conditions': [rng.uniform(0, 50), 0.02, rng.uniform(0.05, 0.3), 2.0, 0, 0.01],
+              'elements': random_elements(rng, 4)} for _ in range(20)]
+
+    def run():
+        for data in cases:
+            RRE.select(data)
+    return run, len(cases)
+
+
+@workload('RRP.select catalog')
+def rrp_select(rng):
+    cases = [({'conditions': [rng.uniform(0, 50), 0.02, 0.125, 0.152, rng.randint(1, 2), 0.005],
+               'elements': random_elements(rng, 4, max_viborka=1)}, rng.uniform(1, 5))
+             for _ in range(20)]
+
+    def run():
+        for data, w in cases:
+            RRP.select(data, w)
+    return run, len(cases)
+
+
+def run(names=None, repeat=5):
+    """
+    param:
+        names : list of string
+            Имена нагрузок (по умолчанию все из WORKLOADS)
+        repeat : integer
+            Количество повторов; в результат идёт лучшее время
+
+    Выполняет замеры. Возвращает dict: meta (окружение) и results
+    {имя: {seconds, evals, evals_per_sec}}.
+    """
+    results = {}
+    with np.errstate(all='ignore'):
+        for name in names or WORKLOADS:
+            func, evals = WORKLOADS[name](random.Random(SEED))
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func()
+                times.append(time.perf_counter() - start)
+            best = min(times)
+            results[name] = {'seconds': best, 'evals': evals, 'evals_per_sec': evals / best}
+    meta = {'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'cpus': os.cpu_count(), 'seed': SEED}
+    return {'meta': meta, 'results': results}
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    param:
+        baseline, current : dict
+            Результаты run
+        threshold : float
+            Допустимое относительное замедление
+
+    Возвращает список регрессий (имя, скорость в baseline, текущая скорость)
+    для нагрузок, где evals_per_sec упала больше, чем на threshold.
+
+    >>> base = {'results': {'a': {'evals_per_sec': 100.0}, 'b': {'evals_per_sec': 100.0}}}
+    >>> cur = {'results': {'a': {'evals_per_sec': 95.0}, 'b': {'evals_per_sec': 80.0}}}
+    >>> compare(base, cur)
+    [('b', 100.0, 80.0)]
+    """
+    regressions = []
+    for name, res in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        base = baseline['results'][name]['evals_per_sec']
+        if res['evals_per_sec'] < base * (1 - threshold):
+            regressions.append((name, base, res['evals_per_sec']))
+    return regressions
+
+
+def report(result):
+    for name, res in result['results'].items():
+        print("{:<36} {:>10.4f} s {:>14,.0f} evals/s".format(name, res['seconds'], res['evals_per_sec']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры скорости расчёта")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="выполнить замеры")
+    run_parser.add_argument('-o', '--output', help="файл результатов (JSON)")
+    run_parser.add_argument('-k', '--workload', action='append', choices=sorted(WORKLOADS),
+                            help="нагрузка (можно несколько раз)")
+    run_parser.add_argument('--repeat', type=int, default=5)
+    compare_parser = commands.add_parser('compare', help="сравнить результаты с базовыми")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help="допустимое замедление (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        result = run(args.workload, args.repeat)
+        report(result)
+        if args.output:
+            with open(args.output, "w") as f_obj:
+                json.dump(result, f_obj, indent=2)
+        return 0
+
+    with open(args.baseline) as f_obj:
+        baseline = json.load(f_obj)
+    with open(args.current) as f_obj:
+        current = json.load(f_obj)
+    regressions = compare(baseline, current, args.threshold)
+    for name, base, cur in regressions:
+        print("РЕГРЕССИЯ {}: {:,.0f} -> {:,.0f} evals/s ({:+.1%})".format(name, base, cur, cur / base - 1))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        cache
+# Purpose:     Дисковый кэш результатов подбора радиаторов
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import RRE
+import RRP
+
+
+CACHE_DIR_ENV = 'RD5_CACHE_DIR'
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'rd5')
+
+# Через сколько новых записей количество записей пересчитывается по базе
+# (её могут менять и другие процессы)
+RECOUNT_EVERY = 1000
+
+# Модули, от которых зависит результат расчёта. Любое изменение в них
+# меняет версию кэша и делает старые записи недействительными.
+MODEL_FILES = ('RRE.py', 'RRP.py', 'radiators.py', 'elements.py')
+
+_model_version = None
+
+
+def model_version():
+    """
+    Возвращает версию расчётной модели - хэш исходников MODEL_FILES.
+    """
+    global _model_version
+    if _model_version is None:
+        digest = hashlib.sha256()
+        base = os.path.dirname(os.path.abspath(__file__))
+        for name in MODEL_FILES:
+            with open(os.path.join(base, name), "rb") as f_obj:
+                digest.update(f_obj.read())
+        _model_version = digest.hexdigest()
+    return _model_version
+
+
+def cache_key(data, mode='RRE', w=None):
+    """
+    param:
+        data : dict
+            Параметры расчёта в формате utils.csv_parser
+        mode : string
+            'RRE' или 'RRP'
+        w : float
+            Скорость потока среды (только для RRP)
+
+    Возвращает ключ кэша: хэш от нормализованных условий и отсортированного
+    списка параметров элементов (порядок элементов на результат не влияет).
+
+    >>> a = {'conditions': [25, 0.02, 0.125, 0.152, 0, 2], 'elements': [[7, 70, 2e-4, 7.6e-5, 6], [5, 60, 1e-4, 7.6e-5, 0]]}
+    >>> b = {'conditions': [25.0, 0.02, 0.125, 0.152, 0.0, 2.0], 'elements': [[5, 60, 1e-4, 7.6e-5, 0], [7, 70, 2e-4, 7.6e-5, 6]]}
+    >>> cache_key(a) == cache_key(b)
+    True
+    >>> cache_key(a) == cache_key(a, 'RRP', 1)
+    False
+    """
+    normalized = [
+        mode,
+        None if w is None else float(w),
+        [float(el) for el in data['conditions']],
+        sorted([float(el) for el in line] for line in data['elements']),
+    ]
+    return hashlib.sha256(json.dumps(normalized).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Кэш результатов подбора в базе SQLite.
+
+    params:
+        directory : string
+            Каталог кэша (по умолчанию переменная окружения RD5_CACHE_DIR
+            или ~/.cache/rd5)
+        max_entries : int
+            Максимальное количество записей. При превышении удаляются записи,
+            которые дольше всего не запрашивались
+        version : string
+            Версия модели (по умолчанию model_version())
+
+    Экземпляр можно использовать из нескольких потоков: обращения к базе
+    выполняются по очереди. Количество записей put ведёт сам и сверяет
+    с базой раз в RECOUNT_EVERY новых записей, поэтому вставка не считает
+    таблицу целиком.
+
+    >>> import tempfile
+    >>> cache = ResultCache(tempfile.mkdtemp(), max_entries=2)
+    >>> cache.get('a')
+    (False, None)
+    >>> cache.put('a', {'area': 0.0025}); cache.put('b', None)
+    >>> cache.get('a'), cache.get('b')
+    ((True, {'area': 0.0025}), (True, None))
+    >>> cache.put('c', {'area': 0.01})
+    >>> len(cache), cache.get('a')
+    (2, (False, None))
+    >>> len(ResultCache(cache.directory, version='other'))
+    0
+    """
+    def __init__(self, directory=None, max_entries=100000, version=None):
+        self.directory = directory or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+        self.max_entries = max_entries
+        self.version = version or model_version()
+        os.makedirs(self.directory, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(self.directory, 'results.sqlite'), timeout=60,
+                                          check_same_thread=False)
+        self._lock = threading.Lock()
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, value TEXT, last_used REAL)")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+            row = self.connection.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+            if row is None or row[0] != self.version:
+                self.connection.execute("DELETE FROM results")
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('version', ?)", (self.version,))
+            self._count = self._recount()
+        self._inserted = 0
+
+
+    def __repr__(self):
+        return "<ResultCache:{}; len={}>".format(self.directory, len(self))
+
+
+    def __len__(self):
+        with self._lock:
+            return self._recount()
+
+
+    def _recount(self):
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+    def get(self, key):
+        """
+        Возвращает (True, значение) для найденной записи, иначе (False, None)
+        """
+        with self._lock, self.connection:
+            row = self.connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False, None
+            self.connection.execute("UPDATE results SET last_used = ? WHERE key = ?",
+                                    (time.time(), key))
+        return True, json.loads(row[0])
+
+
+    def put(self, key, value):
+        """
+        Сохраняет значение value (dict результата подбора или None) по ключу key
+        """
+        with self._lock, self.connection:
+            text, now = json.dumps(value), time.time()
+            if not self.connection.execute("UPDATE results SET value = ?, last_used = ? WHERE key = ?",
+                                           (text, now, key)).rowcount:
+                self.connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                                        (key, text, now))
+                self._inserted += 1
+                self._count = self._recount() if self._inserted % RECOUNT_EVERY == 0 \
+                    else self._count + 1
+            if self._count > self.max_entries:
+                self._count -= self.connection.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used "
+                    "LIMIT ?)", (self._count - self.max_entries,)).rowcount
+
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+def cached_select(data, mode='RRE', w=1, cache=None):
+    """
+    param:
+        data : dict
+            Параметры расчёта в формате utils.csv_parser
+        mode : string
+            'RRE' или 'RRP'
+        w : float
+            Скорость потока среды для RRP [м/с]
+        cache : ResultCache
+            Кэш (по умолчанию ResultCache())
+
+    Подбор радиатора через RRE.select/RRP.select с сохранением результата в кэше.
+    """
+    if cache is None:
+        cache = ResultCache()
+    key = cache_key(data, mode, w if mode == 'RRP' else None)
+    found, res = cache.get(key)
+    if not found:
+        res = RRE.select(data) if mode == 'RRE' else RRP.select(data, w)
+        cache.put(key, res)
+    return res
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
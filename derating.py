@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        derating
+# Purpose:     Обратная задача: предельная мощность элементов и температура
+#              среды для заданного радиатора
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import math
+
+import numpy as np
+
+import RRE
+import RRP
+import utils
+
+
+T_MIN = -60     # Нижняя граница поиска температуры среды [*C]
+
+
+def _columns(elements):
+    """
+    Возвращает массивы max_t и перегрева на контакте при номинальной мощности
+    (power * temp_resist / contact_space) элементов набора.
+    """
+    max_t = np.array(elements.max_t)
+    contact = np.array(elements.power) * np.array(elements.temp_resist) / np.array(elements.contact_space)
+    return max_t, contact
+
+
+def _scale_max(max_t, contact, tb):
+    """
+    Коэффициент мощности, при котором допустимый перегрев обращается в ноль.
+    Элементы без перегрева на контакте (contact = 0) его не ограничивают:
+    если таких элементов весь набор, возвращается inf.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.min(np.where(contact > 0, (max_t - tb) / contact, np.inf), axis=-1)
+
+
+def _capacity(radiator, tb, dtr, n, fr1, k, dks, w, p):
+    if w is None:
+        return RRE.cooling_power(radiator, tb, dtr, n, fr1, k, dks, radiator.step)
+    return RRP.cooling_power(radiator, tb, dtr, n, fr1, k, dks, w, p)
+
+
+def _solve(margin, lo, hi, xtol):
+    """
+    Корень убывающей функции запаса margin на [lo, hi] либо None,
+    если запаса нет уже на lo.
+    """
+    if not margin(lo) > 0:
+        return None
+    if margin(hi) >= 0:
+        return hi
+    return utils.brent_root(margin, lo, hi, xtol)
+
+
+def max_power(radiator, elements, tb, k, dks=None, w=None, xtol=1E-9):
+    """
+    param:
+        radiator : FinnedRadiator
+            Радиатор
+        elements : SetElectronicElements
+            Набор элементов на радиаторе
+        tb : float
+            Температура окружающей среды [*C]
+        k : integer
+            Одно- или двусторонний радиатор
+        dks : float
+            Эквивалентный радиус контакта (по умолчанию, как в RRE.select)
+        w : float
+            Скорость потока среды [м/с]. None - естественная конвекция (RRE),
+            иначе принудительная (RRP)
+        xtol : float
+            Допустимая погрешность коэффициента мощности
+
+    Ищет максимальный коэффициент scale, на который можно умножить мощности
+    всех элементов, чтобы радиатор ещё отводил суммарную мощность:
+    cooling_power(dtr(scale)) >= scale * full_power. С ростом мощности растёт
+    перегрев на контакте элементов, поэтому допустимый перегрев dtr тоже
+    пересчитывается. Корень ищется методом Брента на (0, scale_max], где
+    scale_max - коэффициент, при котором допустимый перегрев обращается в ноль.
+
+    Элементы с нулевым тепловым сопротивлением контакта scale_max не
+    ограничивают; если таких элементов весь набор, верхней границей служит
+    мощность, которую радиатор отводит при перегреве без нагрузки.
+
+    Возвращает dict: scale, power (предельная суммарная мощность [Вт]) и dtr,
+    либо None, если элементы перегреты уже без нагрузки или их мощность нулевая.
+
+    >>> from radiators import FinnedRadiator
+    >>> from elements import ElectronicElement, SetElectronicElements
+    >>> pull = SetElectronicElements(ElectronicElement(5, 70, 1E-4, 7.6E-5, 0),
+    ...                              ElectronicElement(3, 80, 2E-4, 7.6E-5, 0))
+    >>> rad = FinnedRadiator(0.1, 0.1, 0.02)
+    >>> res = max_power(rad, pull, 25, 1)
+    >>> pp = RRE.cooling_power(rad, 25, res['dtr'], 2, 0, 1, math.sqrt(0.2e-3/3.14), 0.01)
+    >>> bool(abs(pp - res['power']) < 1E-6)
+    True
+    >>> ideal = SetElectronicElements(ElectronicElement(5, 70, 1E-4, 0, 0))
+    >>> res = max_power(rad, ideal, 25, 1)
+    >>> pp = RRE.cooling_power(rad, 25, 45, 1, 0, 1, math.sqrt(0.2e-3/3.14), 0.01)
+    >>> res['dtr'], bool(abs(pp - res['power']) < 1E-6)
+    (45.0, True)
+    """
+    if dks is None:
+        dks = math.sqrt(0.2e-3/3.14)
+    max_t, contact = _columns(elements)
+    p = elements.full_power()
+    n = len(elements)
+    fr1 = elements.fr1_full_exclude_surface(radiator.fin_height, step=radiator.step)
+
+    def dtr(scale):
+        return np.min(max_t - scale * contact) - tb
+
+    def margin(scale):
+        return _capacity(radiator, tb, dtr(scale), n, fr1, k, dks, w, scale * p) - scale * p
+
+    if not (p > 0 and dtr(0) > 0):
+        return None
+    hi = _scale_max(max_t, contact, tb)
+    if np.isinf(hi):
+        # перегрев на контакте не растёт с мощностью - ограничивает только радиатор
+        hi = _capacity(radiator, tb, dtr(0), n, fr1, k, dks, w, p) / p
+        for _ in range(RRP.WIDEN):
+            if not margin(hi) >= 0:
+                break
+            hi *= 2
+    scale = _solve(margin, hi * 1E-9, hi * (1 - 1E-9), xtol * hi)
+    if scale is None:
+        return None
+    return {'scale': float(scale), 'power': float(scale * p), 'dtr': float(dtr(scale))}
+
+
+def max_air_temp(radiator, elements, k, dks=None, w=None, t_min=T_MIN, xtol=1E-6):
+    """
+    param:
+        radiator, elements, k, dks, w:
+            См. max_power
+        t_min : float
+            Нижняя граница поиска [*C]
+        xtol : float
+            Допустимая погрешность температуры [*C]
+
+    Ищет максимальную температуру окружающей среды, при которой радиатор
+    ещё отводит суммарную мощность элементов. Возвращает dict: tb и dtr,
+    либо None, если радиатор не справляется даже при t_min.
+
+    >>> from radiators import FinnedRadiator
+    >>> from elements import ElectronicElement, SetElectronicElements
+    >>> pull = SetElectronicElements(ElectronicElement(5, 70, 1E-4, 7.6E-5, 0))
+    >>> res = max_air_temp(FinnedRadiator(0.1, 0.1, 0.02), pull, 1)
+    >>> 25 < res['tb'] < 70 - 5*7.6E-5/1E-4
+    True
+    """
+    if dks is None:
+        dks = math.sqrt(0.2e-3/3.14)
+    p = elements.full_power()
+    n = len(elements)
+    fr1 = elements.fr1_full_exclude_surface(radiator.fin_height, step=radiator.step)
+
+    def margin(tb):
+        dtr = elements.dtr_permissible_overheating(tb)
+        return _capacity(radiator, tb, dtr, n, fr1, k, dks, w, p) - p
+
+    hi = elements.dtr_permissible_overheating(0)
+    tb = _solve(margin, t_min, hi - xtol, xtol)
+    if tb is None:
+        return None
+    return {'tb': tb, 'dtr': elements.dtr_permissible_overheating(tb)}
+
+
+def _set_matrix(sets, fin_height, step):
+    """
+    Параметры наборов элементов в виде массивов формы (1, S) и (1, S, E):
+    наборы разной длины дополняются элементами с max_t = inf, которые
+    не влияют на минимальный допустимый перегрев.
+    """
+    size = max(len(elements) for elements in sets)
+    max_t = np.full((len(sets), size), np.inf)
+    contact = np.zeros((len(sets), size))
+    for i, elements in enumerate(sets):
+        max_t[i, :len(elements)], contact[i, :len(elements)] = _columns(elements)
+    p = np.array([elements.full_power() for elements in sets])
+    n = np.array([len(elements) for elements in sets])
+    fr1 = np.array([elements.fr1_full_exclude_surface(fin_height, step=step) for elements in sets])
+    return p[np.newaxis], n[np.newaxis], fr1[np.newaxis], max_t[np.newaxis], contact[np.newaxis]
+
+
+def _capacity_array(geometry, conditions, w, p):
+    with np.errstate(all='ignore'):
+        if w is None:
+            pp = RRE.cooling_power_array(**geometry, **conditions)['pp']
+        else:
+            pp = RRP.cooling_power_array(**geometry, **conditions, w=w, p=p)['pp']
+    return np.nan_to_num(pp, nan=0)
+
+
+def max_power_array(length, width, fin_height, sets, tb, k, step=10E-3, fin_thick=1E-3,
+                    base_thick=4E-3, dks=None, w=None, xtol=1E-9, maxiter=100):
+    """
+    param:
+        length, width : array_like
+            Длины и ширины радиаторов каталога (C штук) [м]
+        fin_height, step, fin_thick, base_thick : float
+            Остальная геометрия радиаторов [м]
+        sets : list of SetElectronicElements
+            Наборы элементов (S штук)
+        tb, k, dks, w:
+            См. max_power
+        xtol, maxiter:
+            См. utils.bisect_root_array (xtol - относительно scale_max)
+
+    Векторный вариант max_power для всех пар радиатор x набор элементов:
+    делением пополам одновременно решается матрица C x S уравнений.
+    Возвращает dict массивов формы (C, S): scale, power и dtr. Где радиатор
+    не отводит мощность ни при какой нагрузке, scale = nan.
+
+    >>> from radiators import FinnedRadiator
+    >>> from elements import ElectronicElement, SetElectronicElements
+    >>> sets = [SetElectronicElements(ElectronicElement(5, 70, 1E-4, 7.6E-5, 0)),
+    ...         SetElectronicElements(ElectronicElement(5, 70, 1E-4, 7.6E-5, 0),
+    ...                               ElectronicElement(3, 80, 2E-4, 7.6E-5, 0))]
+    >>> res = max_power_array([0.1, 0.15], [0.1, 0.102], 0.02, sets, 25, 1)
+    >>> res['power'].shape
+    (2, 2)
+    >>> exact = max_power(FinnedRadiator(0.1, 0.1, 0.02), sets[1], 25, 1)['power']
+    >>> bool(abs(res['power'][0, 1] - exact) < 1E-6 * exact)
+    True
+    >>> ideal = SetElectronicElements(ElectronicElement(5, 70, 1E-4, 0, 0))
+    >>> res = max_power_array([0.1], [0.1], 0.02, [ideal, sets[1]], 25, 1)
+    >>> exact = max_power(FinnedRadiator(0.1, 0.1, 0.02), ideal, 25, 1)['power']
+    >>> bool(abs(res['power'][0, 0] - exact) < 1E-6 * exact), bool(np.all(np.isfinite(res['power'])))
+    (True, True)
+    >>> hot = SetElectronicElements(ElectronicElement(5, 20, 1E-4, 7.6E-5, 0))
+    >>> res = max_power_array([0.1], [0.1], 0.02, [hot, sets[0]], 25, 1)
+    >>> print(max_power(FinnedRadiator(0.1, 0.1, 0.02), hot, 25, 1), bool(np.isnan(res['power'][0, 0])))
+    None True
+    """
+    if dks is None:
+        dks = math.sqrt(0.2e-3/3.14)
+    geometry = {'length': np.reshape(length, (-1, 1)), 'width': np.reshape(width, (-1, 1)),
+                'fin_height': fin_height, 'step': step, 'fin_thick': fin_thick,
+                'base_thick': base_thick}
+    p, n, fr1, max_t, contact = _set_matrix(sets, fin_height, step)
+    shape = np.broadcast_shapes(geometry['length'].shape, p.shape)
+
+    def dtr(scale):
+        return np.min(max_t - scale[..., np.newaxis] * contact, axis=-1) - tb
+
+    def margin(scale):
+        conditions = {'tb': tb, 'dtr': dtr(scale), 'n': n, 'fr1': fr1, 'k': k, 'dks': dks}
+        return _capacity_array(geometry, conditions, w, scale * p) - scale * p
+
+    # см. max_power: наборы без мощности или перегретые уже при tb не решаются
+    dtr_zero = dtr(np.zeros(shape))
+    hi = np.array(np.broadcast_to(_scale_max(max_t, contact, tb), shape))
+    hi = np.where((p > 0) & (dtr_zero > 0), hi, np.nan)
+    free = np.isinf(hi)
+    if np.any(free):
+        # см. max_power: для наборов без перегрева на контакте - предел радиатора
+        zero = {'tb': tb, 'dtr': dtr_zero, 'n': n, 'fr1': fr1, 'k': k, 'dks': dks}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            hi = np.where(free, _capacity_array(geometry, zero, w, p) / p, hi)
+        hi = np.where((p > 0) & np.isfinite(hi), hi, np.nan)
+        for _ in range(RRP.WIDEN):
+            grow = free & (margin(hi) >= 0)
+            if not np.any(grow):
+                break
+            hi = np.where(grow, hi * 2, hi)
+    lo = hi * 1E-9
+    scale = utils.bisect_root_array(margin, lo, hi, xtol * np.max(hi, initial=0, where=~np.isnan(hi)),
+                                    maxiter)
+    scale = np.where(margin(lo) > 0, scale, np.nan)
+    return {'scale': scale, 'power': scale * p, 'dtr': dtr(scale)}
+
+
+def max_air_temp_array(length, width, fin_height, sets, k, step=10E-3, fin_thick=1E-3,
+                       base_thick=4E-3, dks=None, w=None, t_min=T_MIN, xtol=1E-6, maxiter=100):
+    """
+    param:
+        length, width, fin_height, sets, k, step, fin_thick, base_thick, dks, w:
+            См. max_power_array
+        t_min, xtol:
+            См. max_air_temp
+
+    Векторный вариант max_air_temp для всех пар радиатор x набор элементов.
+    Возвращает dict массивов формы (C, S): tb и dtr. Где радиатор
+    не справляется даже при t_min, tb = nan.
+
+    >>> from radiators import FinnedRadiator
+    >>> from elements import ElectronicElement, SetElectronicElements
+    >>> pull = SetElectronicElements(ElectronicElement(5, 70, 1E-4, 7.6E-5, 0))
+    >>> res = max_air_temp_array([0.1, 0.15], [0.1, 0.102], 0.02, [pull], 1)
+    >>> exact = max_air_temp(FinnedRadiator(0.1, 0.1, 0.02), pull, 1)['tb']
+    >>> bool(abs(res['tb'][0, 0] - exact) < 1E-5)
+    True
+    """
+    if dks is None:
+        dks = math.sqrt(0.2e-3/3.14)
+    geometry = {'length': np.reshape(length, (-1, 1)), 'width': np.reshape(width, (-1, 1)),
+                'fin_height': fin_height, 'step': step, 'fin_thick': fin_thick,
+                'base_thick': base_thick}
+    p, n, fr1, max_t, contact = _set_matrix(sets, fin_height, step)
+    shape = np.broadcast_shapes(geometry['length'].shape, p.shape)
+    dtr0 = np.min(max_t - contact, axis=-1)
+
+    def margin(tb):
+        conditions = {'tb': tb, 'dtr': dtr0 - tb, 'n': n, 'fr1': fr1, 'k': k, 'dks': dks}
+        return _capacity_array(geometry, conditions, w, p) - p
+
+    lo = np.full(shape, float(t_min))
+    hi = np.broadcast_to(dtr0 - xtol, shape)
+    tb = utils.bisect_root_array(margin, lo, hi, xtol, maxiter)
+    tb = np.where((margin(lo) > 0) & (hi > lo), tb, np.nan)
+    return {'tb': tb, 'dtr': dtr0 - tb}
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -7,6 +7,10 @@
 #
 # Created:     21.12.2020
 #-------------------------------------------------------------------------------
+import heapq
+from array import array
+
+import numpy as np
 
 
 class ElectronicElement():
@@ -32,7 +36,9 @@ class ElectronicElement():
     True
     """
 
-    SV = [0, 1E-2, 3E-2, 5E-2, 7.2E-2, 1.05E-1, 1.4E-1]
+    SV = [0, 1E-2, 3E-2, 5E-2, 7.2E-2, 1.05E-1, 1.4E-1]      # шаг рёбер 0.01
+    SV_FORCED = [0, 0.02, 0.045, 0.08, 0.125, 0.180, 0.245]  # шаг рёбер 0.005
+    SV_PINS = [0, 4, 8, 15, 23, 34, 50]                     # количество штырей в выборке
 
     def __init__(self, power, max_t, contact_space, temp_resist, viborka):
         self.power = power
@@ -78,14 +84,36 @@ class ElectronicElement():
         элемента на оребрённую сторону радиатора. Рассчитывается исходя из
         признака выборки по РД5.8794-88 (или ОСТ) [м^2]
         """
+        return 2 * self.sv_table(step)[self.viborka] * fin_height
+
+
+    def fs1_exclude_surface(self, pin_height, pin_diam=3E-3):
+        """
+        param:
+            pin_height : float
+                Высота штырей радиатора [м]
+            pin_diam : float
+                Диаметр штырей [м]
+
+        Возвращает площадь боковой поверхности штырей, изымаемую при установке
+        элемента на штыревую сторону радиатора (по признаку выборки) [м^2]
+        """
+        return 3.14 * pin_diam * self.SV_PINS[self.viborka] * pin_height
+
+
+    @classmethod
+    def sv_table(cls, step):
+        """
+        param:
+            step: float
+                Шаг рёбер
+
+        Возвращает таблицу длин выборки по признаку выборки для заданного шага рёбер
+        """
         if step == 0.01:
-            SV = [0, 1E-2, 3E-2, 5E-2, 7.2E-2, 1.05E-1, 1.4E-1]
-        elif step == 0.005:
-            SV = [0, 0.02, 0.045, 0.08, 0.125, 0.180, 0.245]
-        else:
-            #TODO посчитать SV для других шагов ребра
-            SV = [0, 0.02, 0.045, 0.08, 0.125, 0.180, 0.245]
-        return 2 * SV[self.viborka] * fin_height
+            return cls.SV
+        #TODO посчитать SV для других шагов ребра
+        return cls.SV_FORCED
 
 
 class SetElectronicElements():
@@ -95,6 +123,14 @@ class SetElectronicElements():
     params:
         elements : list of <ElectronicElement>
 
+    Параметры элементов хранятся по столбцам в типизированных массивах
+    (power, max_t, contact_space, temp_resist, viborka). Суммарная мощность
+    и количество элементов по выборкам обновляются приращениями при add/remove/update,
+    элемент с минимальным допустимым перегревом хранится в куче, так что full_power,
+    dtr_permissible_overheating и fr1_full_exclude_surface не перебирают элементы.
+    Температура среды может быть массивом numpy - тогда расчёт ведётся сразу
+    для всех температур.
+
     >>> params = [5, 70, 0.013, 7.6e-05, 6]
     >>> el1 = ElectronicElement(*params)
     >>> params = [7, 50, 0.01, 7.6e-05, 1]
@@ -109,19 +145,91 @@ class SetElectronicElements():
     <SetElectronicElements:len=3; powers:[5, 7, 10]>
     >>> print(pull.dtr_permissible_overheating(40))
     9.9468
+    >>> pull.remove(1)
+    >>> print(pull, pull.full_power(), round(pull.dtr_permissible_overheating(40), 4))
+    <SetElectronicElements:len=2; powers:[5, 10]> 15.0 24.9848
+    >>> pull.update(0, ElectronicElement(2, 45, 0.013, 7.6e-05, 0))
+    >>> print(pull[0].power, round(pull.dtr_permissible_overheating(40), 4))
+    2.0 4.9883
+    >>> import numpy as np
+    >>> np.round(pull.dtr_permissible_overheating(np.array([20, 40])), 4)
+    array([24.9883,  4.9883])
     """
+    FIELDS = ('power', 'max_t', 'contact_space', 'temp_resist', 'viborka')
+
     def __init__(self, *elements):
-        self.pull = []
-        self.pull.extend(elements)
+        self.power = array('d')
+        self.max_t = array('d')
+        self.contact_space = array('d')
+        self.temp_resist = array('d')
+        self.viborka = array('b')
+        self._full_power = 0
+        self._margin = array('d')       # max_t - power * temp_resist / contact_space
+        self._uid = array('q')          # номера элементов в куче _heap
+        self._alive = {}                # номер -> (max_t, power, temp_resist, contact_space)
+        self._heap = []                 # (margin, номер); удалённые элементы убираются лениво
+        self._next_uid = 0
+        self._counts = [0] * len(ElectronicElement.SV)  # количество элементов по выборкам
+        for element in elements:
+            self.add(element)
 
 
     def __repr__(self):
-        return "<SetElectronicElements:len={}; powers:{}>".format(len(self.pull), \
-                                                            [el.power for el in self.pull])
+        return "<SetElectronicElements:len={}; powers:{}>".format(len(self.power), \
+                            [int(p) if p.is_integer() else p for p in self.power])
 
 
     def __len__(self):
-        return len(self.pull)
+        return len(self.power)
+
+
+    def __getitem__(self, index):
+        return ElectronicElement(*(getattr(self, name)[index] for name in self.FIELDS))
+
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+    @staticmethod
+    def _check_viborka(viborka):
+        """
+        Проверяет, что выборка viborka есть в таблицах SV, SV_FORCED и SV_PINS
+        """
+        if not 0 <= viborka < len(ElectronicElement.SV):
+            raise ValueError("viborka must be in range 0..{0}, got {1}".format(
+                len(ElectronicElement.SV) - 1, viborka))
+
+
+    def _sv_total(self, table):
+        """
+        Сумма значений таблицы выборок table по всем элементам набора
+        """
+        return sum(count * value for count, value in zip(self._counts, table))
+
+
+    def _push(self, element):
+        """
+        Присваивает элементу номер и кладёт его допустимый перегрев в кучу.
+        Возвращает (номер, max_t - power * temp_resist / contact_space)
+        """
+        uid = self._next_uid
+        self._next_uid += 1
+        margin = element.max_t - element.power * element.temp_resist / element.contact_space
+        self._alive[uid] = (element.max_t, element.power, element.temp_resist, element.contact_space)
+        heapq.heappush(self._heap, (margin, uid))
+        self._compact()
+        return uid, margin
+
+
+    def _compact(self):
+        """
+        Убирает из кучи удалённые элементы, если их больше половины
+        """
+        if len(self._heap) > 2 * len(self._alive) + 16:
+            self._heap = [item for item in self._heap if item[1] in self._alive]
+            heapq.heapify(self._heap)
 
 
     def add(self, element):
@@ -131,27 +239,90 @@ class SetElectronicElements():
         params:
             element : <ElectronicElement>
                 Экземпляр класса <ElectronicElement>
+
+        >>> pull = SetElectronicElements(ElectronicElement(5, 70, 0.013, 7.6e-05, 6))
+        >>> pull.add(ElectronicElement(7, 50, 0.01, 7.6e-05, -1))
+        Traceback (most recent call last):
+        ...
+        ValueError: viborka must be in range 0..6, got -1
+        >>> print(pull, pull.full_power())
+        <SetElectronicElements:len=1; powers:[5]> 5
+        """
+        self._check_viborka(element.viborka)
+        for name in self.FIELDS:
+            getattr(self, name).append(getattr(element, name))
+        uid, margin = self._push(element)
+        self._uid.append(uid)
+        self._margin.append(margin)
+        self._full_power += element.power
+        self._counts[element.viborka] += 1
+
+
+    def remove(self, index):
+        """
+        Удаляет из набора элемент с номером index
+        """
+        self._full_power -= self.power[index]
+        self._counts[self.viborka[index]] -= 1
+        del self._alive[self._uid[index]]
+        for name in self.FIELDS:
+            del getattr(self, name)[index]
+        del self._margin[index]
+        del self._uid[index]
+        self._compact()
+
+
+    def update(self, index, element):
         """
-        self.pull.append(element)
+        Заменяет элемент с номером index на element <ElectronicElement>
+        """
+        self._check_viborka(element.viborka)
+        self._full_power += element.power - self.power[index]
+        self._counts[self.viborka[index]] -= 1
+        self._counts[element.viborka] += 1
+        del self._alive[self._uid[index]]
+        for name in self.FIELDS:
+            getattr(self, name)[index] = getattr(element, name)
+        self._uid[index], self._margin[index] = self._push(element)
+
+
+    def permissible_overheating(self, air_temp):
+        """
+        Возвращает массив numpy допустимых перегревов всех элементов.
+        Для массива температур air_temp форма результата (len(air_temp), len(self))
+
+        params:
+            air_temp : float or array
+                Температура охлаждающей среды
+        """
+        return np.array(self._margin) - np.asarray(air_temp)[..., np.newaxis]
 
 
     def dtr_permissible_overheating(self, air_temp):
         """
         Возвращает минимальное значение допустимого перегрева для набора элементов
-        на радиаторе
+        на радиаторе (None для пустого набора)
 
         params:
-            air_temp : float
+            air_temp : float or array
                 Температура охлаждающей среды
+
+        >>> print(SetElectronicElements().dtr_permissible_overheating(40))
+        None
         """
-        return min([el.permissible_overheating(air_temp) for el in self.pull])
+        while self._heap and self._heap[0][1] not in self._alive:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        max_t, power, temp_resist, contact_space = self._alive[self._heap[0][1]]
+        return max_t - air_temp - power * temp_resist / contact_space
 
 
     def full_power(self):
         """
         Возвращает суммарную тепловую мощность добавленных элементов
         """
-        return sum([el.power for el in self.pull])
+        return self._full_power
 
 
     def fr1_full_exclude_surface(self, fin_height, step=0.01):
@@ -165,7 +336,21 @@ class SetElectronicElements():
         Возвращает суммарную площадь боковых поверхностей, изъятых при установке
         элементов на оребрённую сторону радиатора
         """
-        return sum([el.fr1_exclude_surface(fin_height, step) for el in self.pull])
+        return 2 * self._sv_total(ElectronicElement.sv_table(step)) * fin_height
+
+
+    def fs1_full_exclude_surface(self, pin_height, pin_diam=3E-3):
+        """
+        param:
+            pin_height: float
+                Высота штырей
+            pin_diam: float
+                Диаметр штырей
+
+        Возвращает суммарную площадь боковой поверхности штырей, изъятых при
+        установке элементов на штыревую сторону радиатора
+        """
+        return 3.14 * pin_diam * self._sv_total(ElectronicElement.SV_PINS) * pin_height
 
 
 if __name__ == '__main__':
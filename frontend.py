@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        frontend
+# Purpose:     Асинхронный подбор радиаторов с объединением одинаковых запросов
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import RRE
+import RRP
+from cache import cache_key
+
+
+MAX_PENDING = 64    # Максимальное количество одновременно выполняемых расчётов
+MAX_QUEUE = 1024    # Максимальное количество различных расчётов в очереди и в работе
+
+
+def _select(data, mode, w):
+    return RRE.select(data) if mode == 'RRE' else RRP.select(data, w)
+
+
+class DesignFrontend:
+    """
+    Асинхронный интерфейс к RRE.select/RRP.select.
+
+    Одинаковые запросы (ключ - cache.cache_key от нормализованных данных
+    utils.csv_parser) во время расчёта не запускаются повторно, а ждут
+    результата уже идущего. Расчёты выполняются в пуле процессов; если
+    одновременно идёт max_pending разных расчётов, новые запросы ждут
+    освобождения места. Очередь ограничена: если в ней уже max_queue
+    различных расчётов, новый запрос отклоняется с asyncio.QueueFull.
+    Таймаут отменяет ожидание вызывающего; сам расчёт отменяется, когда
+    его не ждёт ни один запрос (уже начатый в процессе пула доходит до конца,
+    но результат отбрасывается).
+
+    params:
+        workers : integer
+            Количество процессов пула (по умолчанию os.cpu_count())
+        max_pending : integer
+            Максимальное количество одновременно выполняемых расчётов
+        max_queue : integer
+            Максимальное количество различных расчётов в очереди и в работе
+        timeout : float
+            Таймаут запроса по умолчанию [с] (None - без ограничения)
+
+    >>> data = {'conditions': [25, 0.02, 0.125, 0.152, 1, 0.01],
+    ...         'elements': [[5, 70, 2e-4, 7.6e-5, 0], [3, 90, 2e-4, 7.6e-5, 0]]}
+    >>> same = {'conditions': data['conditions'], 'elements': data['elements'][::-1]}
+    >>> async def run():
+    ...     async with DesignFrontend(workers=2) as frontend:
+    ...         res = await asyncio.gather(frontend.select(data), frontend.select(same),
+    ...                                    frontend.select(data, 'RRP', 2))
+    ...         return res, frontend.computed
+    >>> res, computed = asyncio.run(run())
+    >>> res[0] == res[1] == RRE.select(data), res[2] == RRP.select(data, 2), computed
+    (True, True, 2)
+    >>> async def overload():
+    ...     async with DesignFrontend(workers=1, max_queue=1) as frontend:
+    ...         first = asyncio.ensure_future(frontend.select(data))
+    ...         await asyncio.sleep(0)
+    ...         try:
+    ...             await frontend.select(data, 'RRP', 2)
+    ...         except asyncio.QueueFull:
+    ...             full = True
+    ...         await first
+    ...         try:
+    ...             await frontend.select(data, 'RRP', 2, timeout=0)
+    ...         except asyncio.TimeoutError:
+    ...             await asyncio.sleep(0.1)
+    ...         return full, len(frontend._inflight)
+    >>> asyncio.run(overload())
+    (True, 0)
+    """
+    def __init__(self, workers=None, max_pending=MAX_PENDING, timeout=None, max_queue=MAX_QUEUE):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending, self.max_queue, self.timeout = max_pending, max_queue, timeout
+        self.computed = 0
+        self._pool = ProcessPoolExecutor(self.workers)
+        self._inflight = {}
+        self._waiters = {}      # расчёт -> количество запросов, ждущих его
+        self._slots = None
+
+
+    def __repr__(self):
+        return "<DesignFrontend:workers={}; inflight={}; computed={}>".format(
+            self.workers, len(self._inflight), self.computed)
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+    async def close(self):
+        """
+        Дожидается идущих расчётов и останавливает пул процессов
+        """
+        if self._inflight:
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(None, self._pool.shutdown)
+
+
+    async def _compute(self, key, data, mode, w):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        try:
+            async with self._slots:
+                self.computed += 1
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._pool, _select, data, mode, w)
+        finally:
+            del self._inflight[key]
+
+
+    async def select(self, data, mode='RRE', w=1, timeout=None):
+        """
+        param:
+            data : dict
+                Параметры расчёта в формате utils.csv_parser
+            mode : string
+                'RRE' - естественная конвекция, 'RRP' - принудительная
+            w : float
+                Скорость потока среды для RRP [м/с]
+            timeout : float
+                Таймаут [с] (по умолчанию - таймаут экземпляра)
+
+        Результат RRE.select/RRP.select. При превышении таймаута
+        выбрасывается asyncio.TimeoutError, при заполненной очереди -
+        asyncio.QueueFull.
+        """
+        if mode not in ('RRE', 'RRP'):
+            raise ValueError("unknown mode {0!r}".format(mode))
+        key = cache_key(data, mode, w if mode == 'RRP' else None)
+        task = self._inflight.get(key)
+        if task is None:
+            if len(self._inflight) >= self.max_queue:
+                raise asyncio.QueueFull("{0} computations are already queued".format(
+                    len(self._inflight)))
+            task = asyncio.ensure_future(self._compute(key, data, mode, w))
+            self._inflight[key] = task
+        timeout = self.timeout if timeout is None else timeout
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                task.cancel()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
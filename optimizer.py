@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        optimizer
+# Purpose:     Подбор геометрии радиатора по всем параметрам FinnedRadiator
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import RRE
+import RRP
+from radiators import FinnedRadiator
+
+
+DENSITY = 2.7E3     # Плотность алюминиевого сплава [кг/м^3]
+
+
+def radiator_mass(length, width, fin_height, step=10E-3, fin_thick=1E-3, base_thick=4E-3, k=1,
+                  density=DENSITY):
+    """
+    param:
+        length, width, fin_height, step, fin_thick, base_thick : array_like
+            Геометрия радиатора [м]
+        k : integer
+            Количество оребрённых сторон (2 - рёбра с обеих сторон)
+        density : float
+            Плотность материала [кг/м^3]
+
+    Возвращает массу радиатора [кг]: основание плюс рёбра.
+
+    >>> round(float(radiator_mass(0.1, 0.1, 0.02)), 4)
+    0.162
+    """
+    nz = np.floor_divide(np.subtract(width, fin_thick), step) + 1
+    sides = np.where(np.equal(k, 2), 2, 1)
+    volume = length * width * base_thick + sides * nz * fin_thick * fin_height * length
+    return density * volume
+
+
+def _evaluate(geometry, conditions, w):
+    """
+    Мощность, отводимая радиаторами geometry (dict массивов), в условиях conditions.
+    Выполняется в дочерних процессах, поэтому функция на уровне модуля.
+    """
+    if w is None:
+        return RRE.cooling_power_array(**geometry, **conditions)['pp']
+    return RRP.cooling_power_array(**geometry, **conditions, w=w)['pp']
+
+
+def optimize(elements, tb, k, lengths, widths, fin_heights, steps=(10E-3,), fin_thicks=(1E-3,),
+             objective='area', w=None, base_thick=4E-3, max_volume=None, dks=None,
+             chunk_size=4096, workers=None):
+    """
+    param:
+        elements : SetElectronicElements
+            Набор элементов на радиаторе
+        tb : float
+            Температура окружающей среды [*C]
+        k : integer
+            Количество оребрённых сторон радиатора
+        lengths, widths, fin_heights, steps, fin_thicks : list of float
+            Значения параметров FinnedRadiator, из которых составляется сетка [м]
+        objective : string
+            'area' - минимум площади основания, 'mass' - минимум массы
+        w : float
+            Скорость потока среды [м/с]. None - естественная конвекция (RRE),
+            иначе принудительная (RRP)
+        base_thick : float
+            Толщина основания [м]
+        max_volume : float
+            Максимально допустимый габаритный объём радиатора [м^3]
+        dks : float
+            Эквивалентный радиус контакта (по умолчанию, как в main())
+        chunk_size : integer
+            Количество кандидатов, рассчитываемых за один вызов
+        workers : integer
+            Количество процессов (по умолчанию os.cpu_count(); 1 - без пула)
+
+    Ищет радиатор с минимальной площадью основания (или массой), для которого
+    cooling_power >= full_power. Кандидаты, не проходящие по геометрии
+    (fin_thick >= step, превышение max_volume) отсекаются без расчёта, остальные
+    сортируются по целевой функции и считаются пачками по chunk_size на пуле
+    процессов. Как только в очередной волне пачек находится подходящий
+    радиатор, дальнейшие кандидаты заведомо хуже и не считаются.
+
+    Возвращает dict: radiator (FinnedRadiator), objective, pp и evaluated
+    (количество рассчитанных кандидатов), либо None.
+
+    >>> from elements import ElectronicElement, SetElectronicElements
+    >>> pull = SetElectronicElements(ElectronicElement(7, 70, 0.0002, 0.000076, 6))
+    >>> axis = [i * 0.01 for i in range(1, 16)]
+    >>> res = optimize(pull, 25, 1, axis, axis, [0.01, 0.02, 0.03], workers=1)
+    >>> res['objective'] <= 0.07 * 0.05
+    True
+    >>> res['pp'] >= pull.full_power()
+    True
+    """
+    grid = np.meshgrid(lengths, widths, fin_heights, steps, fin_thicks, indexing='ij')
+    l, b, h1, s, bt = (np.ravel(axis) for axis in grid)
+
+    keep = bt < s
+    if max_volume is not None:
+        sides = 2 if k == 2 else 1
+        keep &= l * b * (base_thick + sides * h1) <= max_volume
+    l, b, h1, s, bt = l[keep], b[keep], h1[keep], s[keep], bt[keep]
+
+    if objective == 'area':
+        value = l * b
+    elif objective == 'mass':
+        value = radiator_mass(l, b, h1, s, bt, base_thick, k)
+    else:
+        raise ValueError("objective must be 'area' or 'mass'")
+    order = np.argsort(value, kind='stable')
+    l, b, h1, s, bt, value = l[order], b[order], h1[order], s[order], bt[order], value[order]
+
+    if dks is None:
+        dks = math.sqrt(0.2e-3/3.14)
+    p = elements.full_power()
+    # Площадь, срезаемая выборками, пропорциональна высоте рёбер и зависит от их шага
+    fr1 = np.zeros_like(h1)
+    for si in np.unique(s):
+        mask = s == si
+        fr1[mask] = h1[mask] * elements.fr1_full_exclude_surface(1, step=si)
+    conditions = {'tb': tb, 'dtr': elements.dtr_permissible_overheating(tb),
+                  'n': len(elements), 'k': k, 'dks': dks}
+    if w is not None:
+        conditions['p'] = p
+
+    def chunk(start):
+        stop = start + chunk_size
+        geometry = {'length': l[start:stop], 'width': b[start:stop], 'fin_height': h1[start:stop],
+                    'step': s[start:stop], 'fin_thick': bt[start:stop], 'base_thick': base_thick}
+        return geometry, dict(conditions, fr1=fr1[start:stop])
+
+    workers = workers or os.cpu_count() or 1
+    starts = list(range(0, len(l), chunk_size))
+    evaluated = 0
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        for wave in range(0, len(starts), workers):
+            batch = starts[wave:wave + workers]
+            if pool is None:
+                results = [_evaluate(*chunk(start), w) for start in batch]
+            else:
+                results = list(pool.map(_evaluate, *zip(*(chunk(start) for start in batch)),
+                                        [w] * len(batch)))
+            pp = np.concatenate(results)
+            evaluated += len(pp)
+            found = np.flatnonzero(pp >= p)
+            if len(found):
+                i = batch[0] + found[0]
+                radiator = FinnedRadiator(float(l[i]), float(b[i]), float(h1[i]), step=float(s[i]),
+                                          base_thick=base_thick, fin_thick=float(bt[i]))
+                return {'radiator': radiator, 'objective': float(value[i]),
+                        'pp': float(pp[found[0]]), 'evaluated': evaluated}
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return None
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        partition
+# Purpose:     Распределение элементов по нескольким радиаторам
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import RRE
+import RRP
+from elements import ElectronicElement, SetElectronicElements
+from radiators import fin_radiator_generator as radiator_generator
+
+
+# Площади сравниваются с таким количеством знаков: распределения с равной
+# суммарной площадью не отличаются погрешностью сложения, и узлы, которые
+# могут только повторить рекорд, отсекаются
+AREA_DIGITS = 12
+
+
+class _Search:
+    """
+    Поиск с возвратом по распределениям элементов. Элементы перебираются
+    в порядке убывания мощности, каждый ставится на уже занятый радиатор
+    или на первый свободный (так каждое разбиение встречается один раз).
+
+    Радиатор группы подбирается RRE.select/RRP.select - первый подходящий
+    в порядке каталога. Подбор не монотонен по составу группы (количество
+    элементов n входит в коэффициент растекания bet), поэтому подбор
+    проверяется только у полного распределения, а неполные отсекаются по
+    нижней границе стоимости.
+
+    Допустимый перегрев группы - минимальный из перегревов её элементов,
+    то есть один из уровней dtr элементов. Для каждого уровня и радиатора
+    каталога заранее считаются оценки мощности сверху и снизу: максимум
+    и минимум по n = 1..N и по крайним значениям fr1 и p. Группа мощностью P
+    (с добавленными элементами - P' <= P + остаток) дойдёт до участка
+    select_radiator, только если P' больше оценок снизу самых широких
+    радиаторов всех предыдущих участков, и получит радиатор с оценкой сверху
+    не меньше P'; площадь группы не меньше наименьшей площади таких
+    радиаторов. Кроме того,
+    площадь группы не меньше суммы весов её элементов p / rho(dtr элемента),
+    где rho - наилучшая удельная мощность каталога [Вт/м^2] на уровне:
+    так оценивается площадь под ещё не поставленные элементы сверх запаса
+    открытых групп. Если остаток мощности больше запаса радиаторов тех же
+    площадей, хотя бы одна группа перейдёт на следующую ступень площади
+    каталога или понадобится новый радиатор. Результаты подбора запоминаются
+    по битовым маскам групп, оценки площади групп - по их мощности и уровням,
+    в пределах одного поиска.
+    """
+    def __init__(self, data, max_radiators, objective, w):
+        self.data, self.w = data, w
+        self.max_radiators, self.objective = max_radiators, objective
+        self.memo, self.areas = {}, {}
+        elements = data['elements']
+        self.order = sorted(range(len(elements)), key=lambda i: -elements[i][0])
+        self._capacity_table()
+        self.rest = [sum(elements[i][0] for i in self.order[j:]) for j in range(len(self.order) + 1)]
+        self.rest_weight = [sum(self.weight[i] for i in self.order[j:])
+                            for j in range(len(self.order) + 1)]
+        self.rest_level = [min((self.level[i] for i in self.order[j:]), default=len(elements))
+                           for j in range(len(self.order) + 1)]
+        self.nodes = 0
+        self.max_nodes = None
+        self.best, self.best_groups = (math.inf, math.inf), None
+
+
+    def __repr__(self):
+        return "<_Search:elements={}; M={}>".format(len(self.order), self.max_radiators)
+
+
+    def _capacity_table(self):
+        """
+        Оценки мощности радиаторов каталога по уровням dtr (см. описание
+        класса): level и weight элементов, cap_high/cap_low [уровень][радиатор],
+        площади area, участки runs [(начало, конец), ...] и cap_max по уровням.
+        """
+        tb, h1, lm, bm, k, s = self.data['conditions']
+        catalog = radiator_generator(k, length=lm, max_width=bm)
+        elements = [ElectronicElement(*el) for el in self.data['elements']]
+        margins = [el.permissible_overheating(tb) for el in elements]
+        levels = sorted(set(margins))
+        self.level = [levels.index(margin) for margin in margins]
+
+        high = low = np.zeros((len(levels), len(catalog)))
+        if catalog and elements:
+            dtr = np.array(levels)[:, None, None, None]
+            fr1 = np.array([0, SetElectronicElements(*elements).fr1_full_exclude_surface(h1, step=s)])
+            n = np.arange(1, len(elements) + 1)[:, None]
+            length = np.array([l for l, b in catalog])[:, None, None]
+            width = np.array([b for l, b in catalog])[:, None, None]
+            dks = math.sqrt(0.2e-3/3.14)
+            with np.errstate(all='ignore'):
+                if self.w is None:
+                    res = RRE.cooling_power_array(length, width, h1, tb, dtr, n, fr1, k, dks)['pp']
+                else:
+                    p = np.array([min(el.power for el in elements), sum(el.power for el in elements)])
+                    res = RRP.cooling_power_array(length[..., None], width[..., None], h1, tb,
+                                                  dtr[..., None], n[..., None], fr1, k, dks, self.w,
+                                                  p[:, None], step=s)['pp']
+            # nan - расчёт не определён: оценка сверху не ограничивает мощность,
+            # оценка снизу ничего не гарантирует
+            res = res.reshape(len(levels), len(catalog), -1)
+            heated = np.array(levels)[:, None] > 0
+            high = np.where(heated, np.fmax(np.where(np.isnan(res), np.inf, res).max(axis=2), 0), 0)
+            low = np.where(heated, np.nan_to_num(res.min(axis=2), nan=0, posinf=0), 0)
+            high, low = high * (1 + 1E-9), np.maximum(low * (1 - 1E-9), 0)
+
+        self.area = [l * b for l, b in catalog]
+        self.cap_high, self.cap_low = high.tolist(), low.tolist()
+        self.cap_max = high.max(axis=1, initial=0).tolist()
+        rho = (high / np.array(self.area)).max(axis=1, initial=0) if catalog else np.zeros(len(levels))
+        self.weight = [el.power / rho[j] if rho[j] > 0 else math.inf
+                       for el, j in zip(elements, self.level)]
+
+        # Различные площади каталога по возрастанию и наибольшая оценка сверху
+        # среди радиаторов не больших площадей (по уровням)
+        self.steps = sorted(set(self.area))
+        self.step_cap = [[max((c for c, a in zip(caps, self.area) if a <= step), default=0)
+                          for step in self.steps] for caps in self.cap_high]
+
+        # Участки перебора select_radiator: RRE.select ищет делением пополам
+        # среди радиаторов одной длины, RRP.select перебирает каталог подряд
+        self.runs = []
+        for index, (l, b) in enumerate(catalog):
+            if self.w is None and self.runs and catalog[index - 1][0] == l and catalog[index - 1][1] < b:
+                self.runs[-1][1] = index + 1
+            else:
+                self.runs.append([index, index + 1])
+
+
+    def group_area(self, power, level, low, top):
+        """
+        Нижняя граница площади радиатора группы мощностью power с уровнем
+        допустимого перегрева level, если после добавления элементов уровень
+        не опустится ниже low, а мощность не превысит top (inf - радиатор
+        не подобрать)
+        """
+        key = power, level, low, top
+        if key in self.areas:
+            return self.areas[key]
+        high, sure = self.cap_high[level], self.cap_low[low]
+        area, skipped = math.inf, 0
+        for start, end in self.runs:
+            # До участка доходит только мощность больше оценок снизу самых
+            # широких радиаторов всех предыдущих участков
+            if skipped >= top:
+                break
+            need = max(power, skipped)
+            for j in range(start, end):
+                if high[j] >= need and self.area[j] < area:
+                    area = self.area[j]
+            skipped = max(skipped, sure[end - 1])
+        self.areas[key] = area
+        return area
+
+
+    def bound(self, stats, i):
+        """
+        Нижняя граница стоимости любого завершения распределения, в котором
+        группы имеют stats [(мощность, уровень, сумма весов), ...], а элементы
+        order[i:] ещё не поставлены
+        """
+        rest = self.rest[i]
+        areas = [self.group_area(power, level, min(level, self.rest_level[i]), power + rest)
+                 for power, level, _ in stats]
+        free = sum(a - weight for a, (_, _, weight) in zip(areas, stats))
+        area = sum(areas) + max(0, self.rest_weight[i] - free)
+        if rest > 0 and not math.isinf(area):
+            # Если остаток не помещается в запас радиаторов тех же площадей,
+            # какой-то группе нужна площадь следующей ступени или новый радиатор
+            spare, raise_ = 0, math.inf
+            for a, (power, level, _) in zip(areas, stats):
+                step = self.steps.index(a)
+                spare += self.step_cap[level][step] - power
+                if step + 1 < len(self.steps):
+                    raise_ = min(raise_, self.steps[step + 1] - a)
+            if len(stats) < self.max_radiators:
+                raise_ = min(raise_, self.steps[0])
+            if rest > spare:
+                area = max(area, sum(areas) + raise_)
+        extra = max(0, self.rest[i] - sum(max(0, self.cap_max[level] - power)
+                                          for power, level, _ in stats))
+        if math.isinf(area) or extra > 0 and not self.cap_max[-1] > 0:
+            return math.inf, math.inf
+        count = len(stats) + (math.ceil(extra / self.cap_max[-1]) if extra > 0 else 0)
+        if count > self.max_radiators:
+            return math.inf, math.inf
+        area = round(area, AREA_DIGITS)
+        return (area, count) if self.objective == 'area' else (count, area)
+
+
+    def select(self, mask):
+        """
+        Результат подбора для группы mask (dict RRE.select/RRP.select) или None
+        """
+        if mask not in self.memo:
+            elements = [el for i, el in enumerate(self.data['elements']) if mask >> i & 1]
+            data = {'conditions': self.data['conditions'], 'elements': elements}
+            self.memo[mask] = RRE.select(data) if self.w is None else RRP.select(data, self.w)
+        return self.memo[mask]
+
+
+    def cost(self, areas):
+        area = round(sum(areas), AREA_DIGITS)
+        return (area, len(areas)) if self.objective == 'area' else (len(areas), area)
+
+
+    def extend(self, groups, stats, i):
+        """
+        Варианты размещения элемента order[i]: список (оценка, группы, stats)
+        в порядке возрастания оценки, без заведомо худших рекорда
+        """
+        element = self.order[i]
+        bit, power = 1 << element, self.data['elements'][element][0]
+        level, weight = self.level[element], self.weight[element]
+        options = []
+        for g in range(len(groups) + (len(groups) < self.max_radiators)):
+            new_groups, new_stats = list(groups), list(stats)
+            if g < len(groups):
+                new_groups[g] |= bit
+                old_power, old_level, old_weight = stats[g]
+                new_stats[g] = (old_power + power, min(old_level, level), old_weight + weight)
+            else:
+                new_groups.append(bit)
+                new_stats.append((power, level, weight))
+            bound = self.bound(new_stats, i + 1)
+            if bound < self.best:
+                options.append((bound, new_groups, new_stats))
+        options.sort(key=lambda option: option[0])
+        return options
+
+
+    def run(self, groups, stats, i):
+        """
+        Поиск в глубину от частичного распределения (первые i элементов order).
+        Возвращает False, если поиск прерван по max_nodes.
+        """
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            return False
+        if i == len(self.order):
+            selected = [self.select(mask) for mask in groups]
+            if any(res is None for res in selected):
+                return True
+            cost = self.cost([res['area'] for res in selected])
+            if cost < self.best:
+                self.best, self.best_groups = cost, groups
+            return True
+        for bound, new_groups, new_stats in self.extend(groups, stats, i):
+            if bound < self.best and not self.run(new_groups, new_stats, i + 1):
+                return False
+        return True
+
+
+    def greedy(self):
+        """
+        Начальный рекорд: каждый элемент (по убыванию мощности) ставится
+        на первый радиатор, который его ещё выдержит, иначе на новый.
+        Рекорд принимается, если в итоге подобраны радиаторы всех групп.
+        """
+        groups = []
+        for i in range(len(self.order)):
+            bit = 1 << self.order[i]
+            for g in range(len(groups)):
+                if self.select(groups[g] | bit) is not None:
+                    groups[g] |= bit
+                    break
+            else:
+                if len(groups) < self.max_radiators:
+                    groups.append(bit)
+                elif groups:
+                    groups[-1] |= bit
+                else:
+                    return
+        selected = [self.select(mask) for mask in groups]
+        if all(res is not None for res in selected):
+            self.best = self.cost([res['area'] for res in selected])
+            self.best_groups = groups
+
+
+def _explore(task):
+    """
+    Поиск в поддереве с заданным началом распределения. Выполняется в дочерних
+    процессах. Возвращает (стоимость, группы, количество узлов, завершён ли поиск).
+    """
+    data, max_radiators, objective, w, best, groups, stats, i, max_nodes = task
+    search = _Search(data, max_radiators, objective, w)
+    search.best, search.max_nodes = best, max_nodes
+    complete = search.run(groups, stats, i)
+    return search.best, search.best_groups, search.nodes, complete
+
+
+def partition(data, max_radiators, objective='area', w=None, split_depth=4, max_nodes=None,
+              workers=None):
+    """
+    param:
+        data : dict
+            Параметры расчёта в формате utils.csv_parser
+        max_radiators : integer
+            Максимальное количество радиаторов
+        objective : string
+            'area' - минимум суммарной площади, 'count' - минимум количества
+            радиаторов (при равенстве - площади)
+        w : float
+            Скорость потока среды [м/с]. None - естественная конвекция (RRE),
+            иначе принудительная (RRP)
+        split_depth : integer
+            Глубина, на которой дерево поиска делится на поддеревья для пула
+        max_nodes : integer
+            Ограничение количества узлов в каждом поддереве (None - без ограничения)
+        workers : integer
+            Количество процессов (по умолчанию os.cpu_count(); 1 - без пула)
+
+    Распределяет элементы из data по радиаторам каталога (условия и каталог -
+    из data['conditions'], как в RRE.select), соблюдая допустимый перегрев
+    и выборки каждой группы. Метод ветвей и границ: начальный рекорд -
+    жадное распределение, результаты подбора по подмножествам (битовым
+    маскам) запоминаются, поддеревья с глубины split_depth обходятся
+    параллельно.
+
+    Возвращает dict: groups (списки номеров элементов), radiators (результаты
+    подбора для групп), area, count, nodes и optimal (поиск не прерывался
+    по max_nodes), либо None, если распределить элементы нельзя.
+
+    >>> data = {'conditions': [25, 0.02, 0.125, 0.152, 1, 0.01],
+    ...         'elements': [[20, 70, 2e-4, 7.6e-5, 0], [18, 70, 2e-4, 7.6e-5, 0],
+    ...                      [3, 90, 2e-4, 7.6e-5, 0], [2, 60, 2e-4, 7.6e-5, 0]]}
+    >>> print(RRE.select(data))
+    None
+    >>> res = partition(data, 3, workers=1)
+    >>> res['groups'], res['count'], res['optimal']
+    ([[0, 2], [1, 3]], 2, True)
+    >>> partition(data, 3, split_depth=2, workers=2)['groups'] == res['groups']
+    True
+
+    Подбор не монотонен по составу группы: второй элемент позволяет
+    подобрать радиатор, который первому одному не подходит.
+
+    >>> data = {'conditions': [25, 0.02, 0.125, 0.152, 1, 0.01],
+    ...         'elements': [[33.62, 73.82, 2e-4, 7.6e-5, 0], [1.28, 94.52, 2e-4, 7.6e-5, 0]]}
+    >>> print(RRE.select({'conditions': data['conditions'], 'elements': data['elements'][:1]}))
+    None
+    >>> res = partition(data, 2, workers=1)
+    >>> res['groups'], res['optimal']
+    ([[0, 1]], True)
+    """
+    search = _Search(data, max_radiators, objective, w)
+    search.greedy()
+
+    # Начала распределений на глубине split_depth (оставшиеся после отсечения)
+    frontier = [([], [], 0)]
+    while frontier and frontier[0][2] < min(split_depth, len(search.order)):
+        frontier = [(groups, stats, i + 1) for old_groups, old_stats, i in frontier
+                    for _, groups, stats in search.extend(old_groups, old_stats, i)]
+    tasks = [(data, max_radiators, objective, w, search.best, groups, stats, i, max_nodes)
+             for groups, stats, i in frontier]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        results = list(map(_explore, tasks))
+    else:
+        with ProcessPoolExecutor(min(workers, len(tasks))) as pool:
+            results = list(pool.map(_explore, tasks))
+
+    best, best_groups = search.best, search.best_groups
+    for cost, groups, nodes, complete in results:
+        if groups is not None and cost < best:
+            best, best_groups = cost, groups
+    if best_groups is None:
+        return None
+
+    groups = sorted([i for i in range(len(data['elements'])) if mask >> i & 1] for mask in best_groups)
+    radiators = [search.select(sum(1 << i for i in group)) for group in groups]
+    return {'groups': groups, 'radiators': radiators, 'area': sum(res['area'] for res in radiators),
+            'count': len(groups), 'nodes': search.nodes + sum(res[2] for res in results),
+            'optimal': all(res[3] for res in results)}
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
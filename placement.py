@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        placement
+# Purpose:     Размещение элементов на основании радиатора
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from plate import CONDUCTIVITY
+
+
+MODES = 64      # Количество гармоник по каждой оси в функции влияния
+
+
+class Influence:
+    """
+    Функции влияния элементов друг на друга на основании радиатора.
+
+    Перегрев основания под площадкой i от мощности, выделяемой на площадке j,
+    берётся из точного решения той же задачи, что и в plate.solve
+    (теплопроводность основания, теплоотдача alff со всей площади,
+    теплоизолированные края), в виде ряда по косинусам:
+        A[i, j] = sum W[m, n] * cx[i, m]*cx[j, m] * cy[i, n]*cy[j, n],
+    где cx, cy - средние по площадкам значения cos(m*pi*x/l) и cos(n*pi*y/b).
+    Гармоники элемента зависят только от его положения, поэтому перемещение
+    одного элемента меняет одну строку и один столбец A: O(n * modes^2)
+    вместо пересчёта всех n^2 взаимодействий.
+
+    params:
+        radiator : FinnedRadiator
+        sides : array
+            Стороны квадратных площадок контакта элементов [м]
+        alff : float
+            Эффективный коэффициент теплоотдачи основания [Вт/м2*К]
+        conductivity : float
+            Теплопроводность материала основания [Вт/м*К]
+        modes : integer
+            Количество гармоник по каждой оси
+    """
+    def __init__(self, radiator, sides, alff, conductivity=CONDUCTIVITY, modes=MODES):
+        self.l, self.b = radiator.length, radiator.width
+        self.sides = np.asarray(sides, dtype=float)
+        self.kx = np.arange(modes) * math.pi / self.l
+        self.ky = np.arange(modes) * math.pi / self.b
+        eps = np.where(np.arange(modes) == 0, 1.0, 2.0)
+        kt = conductivity * radiator.base_thick
+        self.weight = np.outer(eps, eps) / (self.l * self.b) / \
+            (kt * (self.kx[:, np.newaxis]**2 + self.ky**2) + alff)
+
+
+    def __repr__(self):
+        return "<Influence:{}x{}; modes={}>".format(self.l, self.b, len(self.kx))
+
+
+    def harmonics(self, x, y, side):
+        """
+        Средние по площадке со стороной side значения гармоник по осям x и y
+        """
+        half = np.multiply.outer(side, self.kx) / 2
+        cx = np.cos(np.multiply.outer(x, self.kx)) * np.sinc(half / math.pi)
+        half = np.multiply.outer(side, self.ky) / 2
+        cy = np.cos(np.multiply.outer(y, self.ky)) * np.sinc(half / math.pi)
+        return cx, cy
+
+
+    def matrix(self, positions):
+        """
+        Матрица влияния A [К/Вт] для положений positions (массив n x 2)
+        """
+        cx, cy = self.harmonics(positions[:, 0], positions[:, 1], self.sides)
+        return np.einsum('im,jm,mn,in,jn->ij', cx, cx, self.weight, cy, cy, optimize=True)
+
+
+    def row(self, cx, cy, k, x, y):
+        """
+        Строка (и столбец) матрицы влияния для элемента k в точке (x, y)
+        при положениях остальных элементов, заданных гармониками cx, cy.
+        Возвращает (row, гармоники элемента k).
+        """
+        hx, hy = self.harmonics(x, y, self.sides[k])
+        cx, cy = cx.copy(), cy.copy()
+        cx[k], cy[k] = hx, hy
+        return np.sum((cx * hx) @ self.weight * (cy * hy), axis=1), (hx, hy)
+
+
+def junction_temperatures(radiator, elements, positions, alff, tb, conductivity=CONDUCTIVITY,
+                          modes=MODES):
+    """
+    param:
+        radiator, elements, positions, alff, tb, conductivity:
+            См. plate.solve
+        modes : integer
+            Количество гармоник по каждой оси
+
+    Температуры элементов [*C] при размещении positions по функциям влияния
+    (без сеточного расчёта).
+
+    >>> import plate
+    >>> from radiators import FinnedRadiator
+    >>> from elements import ElectronicElement, SetElectronicElements
+    >>> pull = SetElectronicElements(ElectronicElement(5, 70, 1E-4, 7.6E-5, 0),
+    ...                              ElectronicElement(3, 80, 2E-4, 7.6E-5, 0))
+    >>> rad = FinnedRadiator(0.1, 0.1, 0.02)
+    >>> positions = [(0.03, 0.05), (0.07, 0.05)]
+    >>> fast = junction_temperatures(rad, pull, positions, 30, 25)
+    >>> grid = plate.solve(rad, pull, positions, 30, 25, cells=128)['junction']
+    >>> bool(np.all(np.abs(fast - grid) < 0.05))
+    True
+    """
+    sides = np.sqrt(np.array(elements.contact_space))
+    power = np.array(elements.power)
+    a = Influence(radiator, sides, alff, conductivity, modes).matrix(np.asarray(positions, dtype=float))
+    return tb + a @ power + power * np.array(elements.temp_resist) / np.array(elements.contact_space)
+
+
+def _inside(x, y, half, l, b):
+    return half <= x <= l - half and half <= y <= b - half
+
+
+def _free(positions, halves, k, x, y):
+    """
+    Площадка элемента k в точке (x, y) не пересекается с остальными
+    """
+    gap = np.maximum(np.abs(positions[:, 0] - x), np.abs(positions[:, 1] - y)) - (halves + halves[k])
+    gap[k] = 1
+    return bool(np.all(gap >= 0))
+
+
+def _random_layout(gen, halves, l, b, attempts=1000):
+    """
+    Случайное размещение без пересечений (крупные элементы ставятся первыми)
+    """
+    positions = np.full((len(halves), 2), np.inf)
+    for k in np.argsort(-halves):
+        for _ in range(attempts):
+            x, y = gen.uniform(halves[k], l - halves[k]), gen.uniform(halves[k], b - halves[k])
+            if _free(positions, halves, k, x, y):
+                positions[k] = x, y
+                break
+        else:
+            raise ValueError("Не удалось разместить элементы на основании радиатора")
+    return positions
+
+
+def _anneal(task):
+    """
+    Один запуск имитации отжига. Выполняется в дочерних процессах.
+    Возвращает (наихудший запас, положения).
+    """
+    seed, radiator, columns, alff, tb, conductivity, modes, steps = task
+    gen = np.random.default_rng(seed)
+    power, max_t, sides, contact_drop = columns
+    halves = sides / 2
+    l, b = radiator.length, radiator.width
+    influence = Influence(radiator, sides, alff, conductivity, modes)
+
+    positions = _random_layout(gen, halves, l, b)
+    cx, cy = influence.harmonics(positions[:, 0], positions[:, 1], sides)
+    a = influence.matrix(positions)
+    excess = tb + a @ power + contact_drop - max_t      # перегрев сверх max_t
+    cost = excess.max()
+    best, best_positions = cost, positions.copy()
+
+    # Начальная температура - по разбросу стоимости при случайных перемещениях
+    temperature = 0.0
+    for k in gen.integers(len(power), size=min(20, steps)):
+        x, y = gen.uniform(halves[k], l - halves[k]), gen.uniform(halves[k], b - halves[k])
+        row, _ = influence.row(cx, cy, k, x, y)
+        trial = excess + power[k] * (row - a[k])
+        trial[k] = tb + row @ power + contact_drop[k] - max_t[k]
+        temperature = max(temperature, abs(trial.max() - cost))
+    temperature = temperature or 1.0
+    cooling = (1E-4) ** (1 / max(steps, 1))
+    scale = max(l, b) / 4
+
+    for _ in range(steps):
+        k = gen.integers(len(power))
+        x, y = positions[k] + gen.normal(0, scale, 2)
+        if not (_inside(x, y, halves[k], l, b) and _free(positions, halves, k, x, y)):
+            temperature *= cooling
+            continue
+        row, harmonics = influence.row(cx, cy, k, x, y)
+        trial = excess + power[k] * (row - a[k])
+        trial[k] = tb + row @ power + contact_drop[k] - max_t[k]
+        trial_cost = trial.max()
+        if trial_cost <= cost or gen.random() < math.exp((cost - trial_cost) / temperature):
+            positions[k] = x, y
+            cx[k], cy[k] = harmonics
+            a[k], a[:, k] = row, row
+            excess, cost = trial, trial_cost
+            if cost < best:
+                best, best_positions = cost, positions.copy()
+        temperature *= cooling
+        scale = max(min(l, b) / 200, scale * cooling**0.5)
+    return best, best_positions
+
+
+def optimize(radiator, elements, alff, tb, starts=8, steps=5000, seed=None, workers=None,
+             conductivity=CONDUCTIVITY, modes=MODES):
+    """
+    param:
+        radiator : FinnedRadiator
+            Радиатор
+        elements : SetElectronicElements
+            Набор элементов
+        alff : float
+            Эффективный коэффициент теплоотдачи основания [Вт/м2*К]
+        tb : float
+            Температура окружающей среды [*C]
+        starts : integer
+            Количество независимых запусков из случайных размещений
+        steps : integer
+            Количество шагов отжига в одном запуске
+        seed : integer
+            Зерно генератора (запуски получают потоки SeedSequence.spawn)
+        workers : integer
+            Количество процессов (по умолчанию os.cpu_count(); 1 - без пула)
+        conductivity, modes:
+            См. Influence
+
+    Ищет размещение элементов, при котором наибольшее превышение
+    температуры элемента над его max_t минимально. Площадки контакта
+    (квадраты площадью contact_space) не пересекаются и не выходят за
+    основание. Поиск - имитация отжига: на каждом шаге смещается один
+    элемент, и пересчитываются только его строка и столбец матрицы влияния.
+
+    Возвращает dict: positions (список (x, y) [м]), junction (температуры
+    элементов [*C]), margin (max_t - junction), starts (наихудший запас
+    каждого запуска).
+
+    >>> from radiators import FinnedRadiator
+    >>> from elements import ElectronicElement, SetElectronicElements
+    >>> pull = SetElectronicElements(ElectronicElement(5, 70, 1E-4, 7.6E-5, 0),
+    ...                              ElectronicElement(3, 80, 2E-4, 7.6E-5, 0),
+    ...                              ElectronicElement(4, 60, 1E-4, 7.6E-5, 0))
+    >>> rad = FinnedRadiator(0.1, 0.1, 0.02)
+    >>> res = optimize(rad, pull, 30, 25, starts=2, steps=500, seed=1, workers=1)
+    >>> near = junction_temperatures(rad, pull, [(0.04, 0.05), (0.05, 0.05), (0.06, 0.05)], 30, 25)
+    >>> bool(min(res['margin']) > min(np.array(pull.max_t) - near))
+    True
+    """
+    power = np.array(elements.power)
+    contact_space = np.array(elements.contact_space)
+    columns = (power, np.array(elements.max_t), np.sqrt(contact_space),
+               power * np.array(elements.temp_resist) / contact_space)
+    seeds = np.random.SeedSequence(seed).spawn(starts)
+    tasks = [(s, radiator, columns, alff, tb, conductivity, modes, steps) for s in seeds]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or starts == 1:
+        results = list(map(_anneal, tasks))
+    else:
+        with ProcessPoolExecutor(min(workers, starts)) as pool:
+            results = list(pool.map(_anneal, tasks))
+
+    best, positions = min(results, key=lambda res: res[0])
+    positions = [tuple(map(float, p)) for p in positions]
+    junction = junction_temperatures(radiator, elements, positions, alff, tb, conductivity, modes)
+    return {'positions': positions, 'junction': junction, 'margin': columns[1] - junction,
+            'starts': [-float(res[0]) for res in results]}
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
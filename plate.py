@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        plate
+# Purpose:     Поле температуры основания радиатора (сеточный расчёт растекания)
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import math
+
+import numpy as np
+
+
+CONDUCTIVITY = 180      # Теплопроводность алюминиевого сплава [Вт/м*К]
+SMOOTHING = 2           # Количество сглаживаний Якоби до и после спуска на грубую сетку
+OMEGA = 0.8             # Параметр релаксации метода Якоби
+
+
+def grid_size(n):
+    """
+    Ближайшее не меньшее n число вида m*2^j (m <= 8): такую сетку можно
+    огрублять вдвое, пока в ней не останется не больше 8 ячеек.
+
+    >>> grid_size(1000), grid_size(750), grid_size(5)
+    (1024, 768, 5)
+    """
+    j = 0
+    while n > 8 * 2**j:
+        j += 1
+    return math.ceil(n / 2**j) * 2**j
+
+
+class _Level:
+    """
+    Сетка одного уровня многосеточного метода: ny x nx ячеек размером hx x hy.
+    Оператор - пятиточечная разностная схема уравнения
+    kt * (-d2T/dx2 - d2T/dy2) + alff * T = q
+    с теплоизолированными краями (нулевой поток через границу).
+    """
+    def __init__(self, nx, ny, hx, hy, kt, alff):
+        self.nx, self.ny, self.hx, self.hy = nx, ny, hx, hy
+        self.cx, self.cy, self.alff = kt / hx**2, kt / hy**2, alff
+        neighbours_x = np.full(nx, 2.0)
+        neighbours_x[[0, -1]] -= 1
+        neighbours_y = np.full(ny, 2.0)
+        neighbours_y[[0, -1]] -= 1
+        self.diag = self.cx * neighbours_x + self.cy * neighbours_y[:, np.newaxis] + alff
+        self.inverse = None
+
+
+    def apply(self, t):
+        p = np.pad(t, 1, mode='edge')
+        return (self.cx * (2 * t - p[1:-1, :-2] - p[1:-1, 2:])
+                + self.cy * (2 * t - p[:-2, 1:-1] - p[2:, 1:-1]) + self.alff * t)
+
+
+    def solve_dense(self, r):
+        if self.inverse is None:
+            size = self.nx * self.ny
+            eye = np.eye(size).reshape(size, self.ny, self.nx)
+            matrix = np.array([self.apply(e).ravel() for e in eye]).T
+            self.inverse = np.linalg.inv(matrix)
+        return (self.inverse @ r.ravel()).reshape(r.shape)
+
+
+def _restrict(f):
+    """
+    Сгущение вдвое по последней оси (транспонированная интерполяция / 2)
+    """
+    p = np.pad(f, [(0, 0)] * (f.ndim - 1) + [(1, 1)], mode='edge')
+    return 0.375 * (f[..., 0::2] + f[..., 1::2]) + 0.125 * (p[..., 0:-2:2] + p[..., 3::2])
+
+
+def _prolong(c):
+    """
+    Линейная интерполяция вдвое по последней оси (центры ячеек)
+    """
+    p = np.pad(c, [(0, 0)] * (c.ndim - 1) + [(1, 1)], mode='edge')
+    f = np.empty(c.shape[:-1] + (2 * c.shape[-1],))
+    f[..., 0::2] = 0.75 * c + 0.25 * p[..., :-2]
+    f[..., 1::2] = 0.75 * c + 0.25 * p[..., 2:]
+    return f
+
+
+def _hierarchy(nx, ny, hx, hy, kt, alff):
+    levels = [_Level(nx, ny, hx, hy, kt, alff)]
+    while nx > 8 or ny > 8:
+        coarse_x, coarse_y = nx > 8 and nx % 2 == 0, ny > 8 and ny % 2 == 0
+        if not (coarse_x or coarse_y):
+            break
+        if coarse_x:
+            nx, hx = nx // 2, hx * 2
+        if coarse_y:
+            ny, hy = ny // 2, hy * 2
+        levels.append(_Level(nx, ny, hx, hy, kt, alff))
+    return levels
+
+
+def _v_cycle(levels, i, r):
+    """
+    V-цикл с нулевым начальным приближением: симметричный предобусловливатель
+    (одинаковые сглаживания Якоби до и после, сгущение - транспонированная
+    интерполяция)
+    """
+    level = levels[i]
+    if i == len(levels) - 1:
+        if level.nx * level.ny <= 256:
+            return level.solve_dense(r)
+        x = np.zeros_like(r)
+        for _ in range(10 * SMOOTHING):
+            x += OMEGA * (r - level.apply(x)) / level.diag
+        return x
+
+    x = OMEGA * r / level.diag
+    for _ in range(SMOOTHING - 1):
+        x += OMEGA * (r - level.apply(x)) / level.diag
+
+    coarse = levels[i + 1]
+    res = r - level.apply(x)
+    if coarse.nx < level.nx:
+        res = _restrict(res)
+    if coarse.ny < level.ny:
+        res = _restrict(res.T).T
+    e = _v_cycle(levels, i + 1, res)
+    if coarse.ny < level.ny:
+        e = _prolong(e.T).T
+    if coarse.nx < level.nx:
+        e = _prolong(e)
+    x += e
+
+    for _ in range(SMOOTHING):
+        x += OMEGA * (r - level.apply(x)) / level.diag
+    return x
+
+
+def _coverage(centre, side, h, n):
+    """
+    Длины пересечения отрезка [centre - side/2, centre + side/2] с ячейками сетки
+    """
+    edges = np.arange(n + 1) * h
+    return np.clip(np.minimum(edges[1:], centre + side/2) - np.maximum(edges[:-1], centre - side/2),
+                   0, None)
+
+
+def solve(radiator, elements, positions, alff, tb, conductivity=CONDUCTIVITY, cells=256,
+          tol=1E-8, maxiter=200):
+    """
+    param:
+        radiator : FinnedRadiator
+            Радиатор; теплопроводящим считается основание толщиной base_thick
+        elements : SetElectronicElements
+            Набор элементов
+        positions : list of (float, float)
+            Координаты центров элементов на основании (x вдоль длины,
+            y вдоль ширины) [м]. Площадка контакта - квадрат площадью
+            contact_space; выступающая за основание часть отбрасывается,
+            мощность элемента распределяется по оставшейся
+        alff : float
+            Эффективный коэффициент теплоотдачи основания [Вт/м2*К]
+            (например, alff из RRE.cooling_power_array)
+        tb : float
+            Температура окружающей среды [*C]
+        conductivity : float
+            Теплопроводность материала основания [Вт/м*К]
+        cells : integer
+            Количество ячеек сетки вдоль большей стороны основания
+            (округляется вверх до вида m*2^j, см. grid_size)
+        tol : float
+            Допустимая относительная невязка
+        maxiter : integer
+            Максимальное количество итераций
+
+    Рассчитывает поле перегрева основания над средой: теплопроводность
+    в плоскости основания, тепловыделение элементов на площадках контакта
+    и теплоотдача alff со всей площади. Система решается методом сопряжённых
+    градиентов с многосеточным предобусловливателем (V-цикл) без сборки
+    матрицы, поэтому сетка 1000 x 1000 считается за секунды.
+
+    Возвращает dict: theta (перегрев основания, массив ny x nx), hx, hy,
+    contact (средний перегрев основания под каждым элементом),
+    junction (температура элементов с учётом контактного сопротивления [*C]),
+    margin (max_t - junction), bet (отношение перегрева самого горячего
+    контакта к среднему перегреву основания - аналог bet из f1xy),
+    iterations и converged.
+
+    >>> from radiators import FinnedRadiator
+    >>> from elements import ElectronicElement, SetElectronicElements
+    >>> pull = SetElectronicElements(ElectronicElement(5, 70, 1E-4, 7.6E-5, 0),
+    ...                              ElectronicElement(3, 80, 2E-4, 7.6E-5, 0))
+    >>> rad = FinnedRadiator(0.1, 0.1, 0.02)
+    >>> res = solve(rad, pull, [(0.03, 0.05), (0.07, 0.05)], 30, 25, cells=64)
+    >>> res['converged'], res['theta'].shape
+    (True, (64, 64))
+    >>> power = 30 * res['theta'].sum() * res['hx'] * res['hy']
+    >>> round(float(power), 6)
+    8.0
+    >>> bool(res['junction'][0] > res['junction'][1]), bool(res['bet'] > 1)
+    (True, True)
+    """
+    l, b = radiator.length, radiator.width
+    h = max(l, b) / cells
+    nx, ny = grid_size(max(1, round(l / h))), grid_size(max(1, round(b / h)))
+    hx, hy = l / nx, b / ny
+    levels = _hierarchy(nx, ny, hx, hy, conductivity * radiator.base_thick, alff)
+
+    power = np.array(elements.power)
+    contact_space = np.array(elements.contact_space)
+    footprints = []
+    q = np.zeros((ny, nx))
+    for (x, y), p, s in zip(positions, power, contact_space):
+        side = math.sqrt(s)
+        weight = np.outer(_coverage(y, side, hy, ny), _coverage(x, side, hx, nx))
+        area = weight.sum()
+        if area <= 0:
+            raise ValueError("Элемент в точке ({}, {}) вне основания радиатора".format(x, y))
+        weight /= area
+        footprints.append(weight)
+        q += p * weight / (hx * hy)
+
+    # Метод сопряжённых градиентов с предобусловливателем
+    level = levels[0]
+    t = np.zeros_like(q)
+    r = q.copy()
+    z = _v_cycle(levels, 0, r)
+    d = z.copy()
+    rz = np.vdot(r, z)
+    norm = math.sqrt(np.vdot(q, q))
+    iterations, converged = 0, norm == 0
+    while not converged and iterations < maxiter:
+        ad = level.apply(d)
+        step = rz / np.vdot(d, ad)
+        t += step * d
+        r -= step * ad
+        iterations += 1
+        converged = math.sqrt(np.vdot(r, r)) <= tol * norm
+        z = _v_cycle(levels, 0, r)
+        rz, rz_old = np.vdot(r, z), rz
+        d = z + (rz / rz_old) * d
+
+    contact = np.array([np.vdot(weight, t) for weight in footprints])
+    junction = tb + contact + power * np.array(elements.temp_resist) / contact_space
+    return {'theta': t, 'hx': hx, 'hy': hy, 'contact': contact, 'junction': junction,
+            'margin': np.array(elements.max_t) - junction,
+            'bet': float(np.max(contact) / np.mean(t)) if len(contact) else 1.0,
+            'iterations': iterations, 'converged': converged}
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -7,6 +7,7 @@
 #
 # Created:     21.12.2020
 #--------------------------------------------
+import numpy as np
 
 
 class FinnedRadiator:
@@ -26,6 +27,8 @@ class FinnedRadiator:
         step : int
             Шаг рёбер [м]
 
+    Экземпляр неизменяемый: производные размеры (количество рёбер, площади,
+    эквивалентный диаметр) считаются один раз при создании.
 
     >>> rad = FinnedRadiator(length=35E-3, width=30E-3, fin_height=0.01, step=0.01, base_thick=0.004, fin_thick=0.001)
     >>> rad.edge_number()
@@ -38,14 +41,55 @@ class FinnedRadiator:
     0.0014
     >>> round(rad.equal_diameter(), 7)
     0.0094737
+    >>> rad.width = 0.05
+    Traceback (most recent call last):
+    ...
+    AttributeError: FinnedRadiator is immutable
+    >>> [r.width for r in FinnedRadiator.from_arrays(0.05, [0.032, 0.052], 0.02)]
+    [0.032, 0.052]
     """
+    __slots__ = ('length', 'width', 'fin_height', 'base_thick', 'fin_thick', 'step',
+                 '_edge_number', '_half_step', '_fins_surface', '_flat_surface',
+                 '_full_surface', '_equal_diameter')
+
     def __init__(self, length, width, fin_height, step=10E-3, base_thick=4E-3, fin_thick=1E-3):
-        self.length = length
-        self.width = width
-        self.fin_height = fin_height
-        self.base_thick = base_thick
-        self.fin_thick = fin_thick
-        self.step = step
+        init = object.__setattr__
+        init(self, 'length', length)
+        init(self, 'width', width)
+        init(self, 'fin_height', fin_height)
+        init(self, 'base_thick', base_thick)
+        init(self, 'fin_thick', fin_thick)
+        init(self, 'step', step)
+
+        nz = (width - fin_thick) // step + 1
+        dell = (step - fin_thick) / 2
+        init(self, '_edge_number', nz)
+        init(self, '_half_step', dell)
+        init(self, '_fins_surface', (nz - 1) * (length * fin_height * 2))
+        init(self, '_flat_surface', width * length)
+        init(self, '_full_surface', length * width + 2 * fin_height * length +  \
+            2 * base_thick * (length + width) + 2 * nz * fin_height * fin_thick)
+        # площадь канала между рёбрами и его периметр
+        init(self, '_equal_diameter', 4 * (2 * dell * fin_height) / (2 * (fin_height + 2 * dell)))
+
+    @classmethod
+    def from_arrays(cls, length, width, fin_height, step=10E-3, base_thick=4E-3, fin_thick=1E-3):
+        """
+        Создаёт список радиаторов из массивов размеров (приводятся друг к другу
+        по правилам broadcasting numpy).
+        """
+        columns = np.broadcast_arrays(length, width, fin_height, step, base_thick, fin_thick)
+        return [cls(*params) for params in zip(*(np.ravel(col).tolist() for col in columns))]
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FinnedRadiator is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("FinnedRadiator is immutable")
+
+    def __reduce__(self):
+        return (FinnedRadiator, (self.length, self.width, self.fin_height, self.step,
+                                 self.base_thick, self.fin_thick))
 
     def __repr__(self):
         res = \
@@ -65,15 +109,14 @@ class FinnedRadiator:
         nz
         Количество рёбер. []
         """
-        return (self.width - self.fin_thick) // self.step + 1
+        return self._edge_number
 
     def flat_surface(self):
         """
         fp
         Площадь основания радиатора. [м^2]
         """
-        res = self.width * self.length
-        return res
+        return self._flat_surface
 
     def half_step(self):
         """
@@ -81,16 +124,14 @@ class FinnedRadiator:
         Половина расстояния между рёбер. Используется в качестве определяющего
         размера в критериях подобия. [м]
         """
-        res = (self.step - self.fin_thick) / 2
-        return res
+        return self._half_step
 
     def fins_surface(self):
         """
         fr
         Площадь поверхности всех рёбер. [м^2]
         """
-        res = (self.edge_number() - 1) * (self.length * self.fin_height * 2)
-        return res
+        return self._fins_surface
 
     def fins_surface_with_element(self, fr1):
         """
@@ -100,7 +141,7 @@ class FinnedRadiator:
             fr1 : int
                 Площадь поверхности срезанных рёбер [м^2]
         """
-        res = self.fins_surface() - fr1
+        res = self._fins_surface - fr1
         if res > 0:
             return res
         else:
@@ -111,10 +152,7 @@ class FinnedRadiator:
         f0
         Полная площадь поверхности радиатора без боковых поверхностей рёбер. [м^2]
         """
-        res = self.length * self.width + 2 * self.fin_height * self.length +  \
-            2 * self.base_thick * (self.length + self.width) + \
-            2 * self.edge_number() * self.fin_height * self.fin_thick
-        return res
+        return self._full_surface
 
     def equal_diameter(self):
         """
@@ -122,12 +160,109 @@ class FinnedRadiator:
         dell - половина расстояния между рёбрами, h1 - высота ребра
         На выходе Real
         """
-        dell = self.half_step()
-        h1 = self.fin_height
+        return self._equal_diameter
+
+
+class PinRadiator:
+    """
+    Штыревой радиатор.
+    param:
+        length : float
+            Длина радиатора [м]
+        width : float
+            Ширина радиатора [м]
+        pin_height : float
+            Высота штырей [м]
+        step : float
+            Шаг штырей [м]
+        pin_diam : float
+            Диаметр штырей [м]
+
+    >>> rad = PinRadiator(0.05, 0.052, 0.0125)
+    >>> round(rad.pins_number(), 3)
+    51.0
+    >>> round(rad.pins_surface(), 7)
+    0.0060053
+    >>> round(rad.base_surface(), 7)
+    0.0022397
+    """
+    def __init__(self, length, width, pin_height, step=7E-3, pin_diam=3E-3):
+        self.length = length
+        self.width = width
+        self.pin_height = pin_height
+        self.step = step
+        self.pin_diam = pin_diam
+
+    def __repr__(self):
+        res = \
+        """
+<PinRadiator>
+        length {}
+        width {}
+        pin_height {}
+        step {}
+        pin_diam {}
+        """.format(self.length, self.width, self.pin_height, self.step, self.pin_diam)
+        return res
+
+    def rows_number(self):
+        """
+        n1
+        Количество рядов штырей вдоль длины радиатора (по направлению потока). []
+        """
+        return (self.length - 0.008) / self.step + 1
 
-        area = 2 * dell * h1  # площадь канала между рёбрами
-        perimeter = 2 * (h1 + 2 * dell)  # периметр канала между рёбрами
-        return 4 * area / perimeter
+    def pins_number(self):
+        """
+        nz
+        Количество штырей. []
+        """
+        return self.rows_number() * ((self.width - 0.008) / self.step + 1)
+
+    def flat_surface(self):
+        """
+        fp
+        Площадь основания радиатора. [м^2]
+        """
+        return self.length * self.width
+
+    def pins_surface(self):
+        """
+        fs
+        Площадь боковой поверхности всех штырей. [м^2]
+        """
+        return 3.14 * self.pin_diam * self.pin_height * self.pins_number()
+
+    def base_surface(self):
+        """
+        f0
+        Площадь основания между штырями. [м^2]
+        """
+        return self.length * self.width - 0.785 * self.pin_diam ** 2 * self.pins_number()
+
+
+def pin_radiator_generator(k=1):
+    """
+    param:
+        k : integer
+            1 - односторонний, 2 - двусторонний штыревой радиатор
+
+    Возвращает список параметров штыревых радиаторов (длину и ширину)
+    в формате [[l1, b1], [l1, b2],...]
+
+    >>> print(pin_radiator_generator(1)[:3])
+    [[0.036, 0.032], [0.036, 0.072], [0.05, 0.032]]
+    """
+    L1 = [0.036, 0.036, 0.05, 0.05, 0.05, 0.08, 0.08, 0.08, 0.1, 0.1, 0.1,
+            0.125, 0.125, 0.125]
+    B1 = [0.032, 0.072, 0.032, 0.052, 0.092, 0.032, 0.072, 0.122, 0.052, 0.092,
+            0.152, 0.072, 0.122, 0.152]
+    L2 = [0.05, 0.05, 0.05, 0.08, 0.08, 0.08, 0.1, 0.1, 0.1, 0.125, 0.125,
+            0.125, 0.125, 0.125]
+    B2 = [0.032, 0.052, 0.092, 0.032, 0.072, 0.122, 0.152, 0.092, 0.152, 0.072,
+            0.122, 0.152, 0.152, 0.152]
+    radiators = {1: [list(el) for el in zip(L1, B1)], 2: [list(el) for el in zip(L2, B2)]}
+    return radiators[k]
 
 
 def fin_radiator_generator(k=1, length=0.01, max_width=0.5, step=0.01):
@@ -171,6 +306,94 @@ def fin_radiator_generator(k=1, length=0.01, max_width=0.5, step=0.01):
     return radiators[k]
 
 
+def select_radiator(radiators, capacity, required, monotone=True):
+    """
+    param:
+        radiators : list
+            Список радиаторов [[l1, b1], [l1, b2],...] из fin_radiator_generator
+        capacity : callable
+            Функция capacity(l, b), возвращающая отводимую радиатором мощность [Вт]
+        required : float
+            Требуемая мощность [Вт]
+        monotone : bool
+            Признак того, что мощность радиатора при фиксированной длине
+            растёт с шириной до максимума, а дальше может только убывать
+            (RRE: после максимума мощность немного падает)
+
+    Возвращает (индекс, мощность) первого в порядке списка радиатора, для которого
+    capacity >= required, либо None.
+
+    Список разбивается на участки с одинаковой длиной и возрастающей шириной.
+    Если monotone, от самого широкого радиатора участка ищется максимум
+    мощности (пока более узкий сосед мощнее): участок без подходящего
+    максимума пропускается, а до максимума минимальная ширина ищется делением
+    пополам (O(log n) вычислений, если мощность убывает лишь у края участка).
+    При monotone=False участок просматривается подряд, как раньше в main().
+
+    >>> calls = []
+    >>> def capacity(l, b):
+    ...     calls.append(b)
+    ...     return l * b * 1000
+    >>> rads = fin_radiator_generator(0, 0.1, 1.0, 0.001)
+    >>> index, pp = select_radiator(rads, capacity, 50)
+    >>> rads[index], len(calls) < 15
+    ([0.1, 0.5], True)
+    >>> del calls[:]
+    >>> select_radiator(rads, capacity, 50, monotone=False)[0] == index, len(calls)
+    (True, 500)
+    >>> del calls[:]
+    >>> print(select_radiator(rads, capacity, 1000))
+    None
+    >>> len(calls) == 2 * len({l for l, b in rads})
+    True
+    >>> select_radiator(fin_radiator_generator(1), capacity, 7)
+    (7, 9.76)
+    >>> peaked = lambda l, b: 10 - (b - 0.87) ** 2
+    >>> rads = fin_radiator_generator(0, 0.3, 0.99, 0.01)
+    >>> index, pp = select_radiator(rads, peaked, 9.999)
+    >>> index == select_radiator(rads, peaked, 9.999, monotone=False)[0], rads[index]
+    (True, [0.3, 0.84])
+    """
+    evaluated = {}
+
+    def value(i):
+        if i not in evaluated:
+            evaluated[i] = capacity(*radiators[i])
+        return evaluated[i]
+
+    def adequate(i):
+        return value(i) >= required
+
+    start = 0
+    while start < len(radiators):
+        end = start + 1
+        while end < len(radiators) and radiators[end][0] == radiators[start][0] \
+                and radiators[end][1] > radiators[end - 1][1]:
+            end += 1
+
+        if not monotone:
+            for i in range(start, end):
+                if adequate(i):
+                    return i, evaluated[i]
+            start = end
+            continue
+        peak = end - 1
+        while peak > start and value(peak - 1) > value(peak):
+            peak -= 1
+        if adequate(peak):
+            lo, hi = start - 1, peak        # capacity(lo) < required <= capacity(hi)
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if adequate(mid):
+                    hi = mid
+                else:
+                    lo = mid
+            return hi, evaluated[hi]
+        start = end
+
+    return None
+
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        service
+# Purpose:     Долгоживущий сервис подбора радиаторов (JSON lines)
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import argparse
+import json
+import math
+import os
+import queue
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+import RRE
+import RRP
+from cache import ResultCache, cache_key
+from elements import ElectronicElement, SetElectronicElements
+from radiators import fin_radiator_generator as radiator_generator
+from radiators import select_radiator
+
+
+WINDOW = 0.005      # Время ожидания запросов для объединения в пакет [с]
+MAX_BATCH = 256     # Максимальное количество запросов в пакете
+
+
+class DesignService:
+    """
+    Подбор радиаторов с сохранением состояния между запросами.
+
+    Запрос - dict с условиями и элементами в формате utils.csv_parser
+    (conditions, elements), необязательными id, mode ('RRE' или 'RRP') и w
+    (скорость потока; если задана, а mode нет, считается RRP). Ответ - dict
+    в формате batch.run_case: id, status ('ok', 'not_found' или 'error')
+    и параметры радиатора либо error.
+
+    Каталоги радиаторов запоминаются по (k, длина, ширина). Все запросы
+    пакета одного режима считаются одним вызовом cooling_power_array на
+    объединённых каталогах, после чего радиатор выбирается select_radiator
+    по готовым мощностям - так же, как в RRE.select/RRP.select. Радиатор,
+    у которого выборки срезали все рёбра, при RRP считается неподходящим.
+
+    params:
+        cache : ResultCache
+            Кэш результатов (None - без кэша)
+    """
+    def __init__(self, cache=None):
+        self.cache = cache
+        self._catalogs = {}
+
+
+    def __repr__(self):
+        return "<DesignService:catalogs={}; cache={}>".format(len(self._catalogs), self.cache)
+
+
+    def catalog(self, k, length, max_width):
+        """
+        Каталог радиаторов: (список [[l, b], ...], массив длин, массив ширин)
+        """
+        key = (k, length, max_width)
+        if key not in self._catalogs:
+            radiators = radiator_generator(k, length=length, max_width=max_width)
+            arr = np.array(radiators, dtype=float).reshape(-1, 2)
+            self._catalogs[key] = (radiators, arr[:, 0], arr[:, 1])
+        return self._catalogs[key]
+
+
+    def prepare(self, request):
+        """
+        Разбор запроса: dict с режимом, данными, условиями расчёта и каталогом
+        """
+        data = {'conditions': [float(el) for el in request['conditions']],
+                'elements': [[float(el) for el in line] for line in request['elements']]}
+        w = request.get('w')
+        mode = request.get('mode', 'RRE' if w is None else 'RRP')
+        if mode not in ('RRE', 'RRP'):
+            raise ValueError("unknown mode {0!r}".format(mode))
+        if mode == 'RRP':
+            w = 1.0 if w is None else float(w)
+
+        gather_elements = SetElectronicElements()
+        tb, h1, lm, bm, k, s = data['conditions']
+        for el in data['elements']:
+            gather_elements.add(ElectronicElement(*el))
+
+        s0 = 0.2e-3     # Как в RRE.select
+        conditions = {'tb': tb, 'dtr': gather_elements.dtr_permissible_overheating(tb),
+                      'n': len(gather_elements), 'fr1': gather_elements.fr1_full_exclude_surface(h1, step=s),
+                      'k': k, 'dks': math.sqrt(s0/3.14)}
+        return {'mode': mode, 'w': w, 'data': data, 'h1': h1, 's': s, 'conditions': conditions,
+                'p': gather_elements.full_power(), 'catalog': self.catalog(k, lm, bm)}
+
+
+    def _capacities(self, cases):
+        """
+        Мощности каталогов всех случаев одного режима за один вызов cooling_power_array
+        """
+        sizes = [len(case['catalog'][0]) for case in cases]
+        l = np.concatenate([case['catalog'][1] for case in cases])
+        b = np.concatenate([case['catalog'][2] for case in cases])
+
+        def column(values):
+            return np.repeat(np.array(values, dtype=float), sizes)
+
+        conditions = {name: column([case['conditions'][name] for case in cases])
+                      for name in cases[0]['conditions']}
+        h1 = column([case['h1'] for case in cases])
+        if cases[0]['mode'] == 'RRE':
+            pp = RRE.cooling_power_array(l, b, h1, **conditions)['pp']
+        else:
+            pp = RRP.cooling_power_array(l, b, h1, w=column([case['w'] for case in cases]),
+                                         p=column([case['p'] for case in cases]),
+                                         step=column([case['s'] for case in cases]), **conditions)['pp']
+        return np.split(pp, np.cumsum(sizes)[:-1])
+
+
+    def _select(self, case, pp):
+        radiators = case['catalog'][0]
+        capacity = dict(zip(map(tuple, radiators), pp.tolist()))
+        selected = select_radiator(radiators, lambda l, b: capacity[(l, b)], case['p'],
+                                   monotone=case['mode'] == 'RRE')
+        if selected is None:
+            return None
+        index, pp = selected
+        l, b = radiators[index]
+        return {'length': l, 'width': b, 'fin_height': case['h1'], 'area': l*b, 'pp': pp,
+                'power': case['p']}
+
+
+    def evaluate(self, requests):
+        """
+        param:
+            requests : list of dict
+                Запросы (см. описание класса)
+
+        Обрабатывает пакет запросов. Ошибки отдельных запросов не прерывают
+        пакет. Возвращает список ответов в порядке requests.
+
+        >>> data = {'conditions': [25, 0.02, 0.125, 0.152, 1, 0.01],
+        ...         'elements': [[5, 70, 2e-4, 7.6e-5, 0], [3, 90, 2e-4, 7.6e-5, 0]]}
+        >>> service = DesignService()
+        >>> res = service.evaluate([dict(data, id=1), dict(data, id=2, w=2), {'id': 3}])
+        >>> [r['status'] for r in res]
+        ['ok', 'ok', 'error']
+        >>> expected = RRE.select(data)
+        >>> (res[0]['length'], res[0]['width']) == (expected['length'], expected['width'])
+        True
+        >>> expected = RRP.select(data, 2)
+        >>> (res[1]['length'], res[1]['width']) == (expected['length'], expected['width'])
+        True
+        """
+        responses = [{'id': request.get('id') if isinstance(request, dict) else None}
+                     for request in requests]
+        pending = {'RRE': [], 'RRP': []}
+        for response, request in zip(responses, requests):
+            try:
+                case = self.prepare(request)
+            except Exception as err:
+                response.update(status='error', error='{0}: {1}'.format(type(err).__name__, err))
+                continue
+            if self.cache is not None:
+                case['key'] = cache_key(case['data'], case['mode'], case['w'])
+                found, res = self.cache.get(case['key'])
+                if found:
+                    _finish(response, res)
+                    continue
+            pending[case['mode']].append((response, case))
+
+        for group in pending.values():
+            if not group:
+                continue
+            try:
+                capacities = self._capacities([case for _, case in group])
+            except Exception as err:
+                for response, _ in group:
+                    response.update(status='error', error='{0}: {1}'.format(type(err).__name__, err))
+                continue
+            for (response, case), pp in zip(group, capacities):
+                res = self._select(case, pp)
+                if self.cache is not None:
+                    self.cache.put(case['key'], res)
+                _finish(response, res)
+        return responses
+
+
+def _finish(response, res):
+    if res is None:
+        response['status'] = 'not_found'
+    else:
+        response['status'] = 'ok'
+        response.update(res)
+
+
+class Batcher:
+    """
+    Объединение запросов в пакеты. Запросы, пришедшие в течение window
+    секунд после первого (но не больше max_batch), обрабатываются одним
+    вызовом DesignService.evaluate в отдельном потоке.
+
+    params:
+        service : DesignService
+        window : float
+            Время ожидания запросов [с]
+        max_batch : integer
+            Максимальное количество запросов в пакете
+    """
+    def __init__(self, service, window=WINDOW, max_batch=MAX_BATCH):
+        self.service, self.window, self.max_batch = service, window, max_batch
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+    def __repr__(self):
+        return "<Batcher:window={}; max_batch={}; batches={}>".format(
+            self.window, self.max_batch, self.batches)
+
+
+    def submit(self, request):
+        """
+        Ставит запрос в очередь. Возвращает Future с ответом.
+        """
+        future = Future()
+        self._queue.put((request, future))
+        return future
+
+
+    def close(self):
+        """
+        Обрабатывает оставшиеся запросы и останавливает поток
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self.batches += 1
+            try:
+                responses = self.service.evaluate([request for request, _ in batch])
+            except Exception as err:
+                for _, future in batch:
+                    future.set_exception(err)
+            else:
+                for (_, future), response in zip(batch, responses):
+                    future.set_result(response)
+
+
+def _parse(line):
+    try:
+        return json.loads(line)
+    except ValueError as err:
+        return {'_error': 'JSONDecodeError: {0}'.format(err)}
+
+
+def stream(batcher, lines, write):
+    """
+    param:
+        batcher : Batcher
+        lines : iterable of string
+            Запросы в формате JSON, по одному в строке (пустые строки пропускаются)
+        write : callable
+            Функция записи строки ответа
+
+    Передаёт запросы в batcher по мере чтения и выводит ответы в порядке
+    запросов, не дожидаясь конца входного потока. Если пакет не удалось
+    обработать целиком, на каждый его запрос выводится ответ со status
+    'error'. Ошибка записи ответа пробрасывается. Возвращает количество
+    запросов, для которых обработка завершилась исключением.
+
+    >>> import io
+    >>> data = {'conditions': [25, 0.02, 0.125, 0.152, 1, 0.01],
+    ...         'elements': [[5, 70, 2e-4, 7.6e-5, 0], [3, 90, 2e-4, 7.6e-5, 0]]}
+    >>> lines = [json.dumps(dict(data, id=i, w=i)) for i in (1, 2, 3)] + ['not json']
+    >>> out = io.StringIO()
+    >>> batcher = Batcher(DesignService(), window=0.05)
+    >>> stream(batcher, lines, out.write)
+    0
+    >>> batcher.close()
+    >>> batcher.batches
+    1
+    >>> [(r['id'], r['status']) for r in map(json.loads, out.getvalue().splitlines())]
+    [(1, 'ok'), (2, 'ok'), (3, 'ok'), (None, 'error')]
+    """
+    futures = queue.Queue()
+    failures, errors = [], []
+
+    def writer():
+        try:
+            while True:
+                item = futures.get()
+                if item is None:
+                    break
+                request_id, future = item
+                try:
+                    response = future.result()
+                except Exception as err:
+                    failures.append(err)
+                    response = {'id': request_id, 'status': 'error',
+                                'error': '{0}: {1}'.format(type(err).__name__, err)}
+                write(json.dumps(response, ensure_ascii=False) + "\n")
+        except BaseException as err:
+            errors.append(err)
+            # Дочитываем очередь, чтобы не блокировать чтение запросов
+            while futures.get() is not None:
+                pass
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    try:
+        for line in lines:
+            if errors:
+                break
+            if not line.strip():
+                continue
+            request = _parse(line)
+            if isinstance(request, dict) and '_error' in request:
+                future = Future()
+                future.set_result({'id': None, 'status': 'error', 'error': request['_error']})
+            else:
+                future = batcher.submit(request)
+            futures.put((request.get('id') if isinstance(request, dict) else None, future))
+    finally:
+        futures.put(None)
+        thread.join()
+    if errors:
+        raise errors[0]
+    return len(failures)
+
+
+def serve_socket(path, batcher):
+    """
+    Обслуживает запросы на локальном (unix) сокете path. Каждое соединение -
+    поток JSON lines, как для stdin; пакеты собираются из всех соединений.
+    """
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            lines = (line.decode('utf-8') for line in self.rfile)
+
+            def write(text):
+                self.wfile.write(text.encode('utf-8'))
+                self.wfile.flush()
+            stream(batcher, lines, write)
+
+    if os.path.exists(path):
+        os.remove(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        server.daemon_threads = True
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    os.remove(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервис подбора радиаторов (JSON lines)")
+    parser.add_argument('--socket', default=None, metavar='PATH',
+                        help="unix сокет (по умолчанию stdin/stdout)")
+    parser.add_argument('--window', type=float, default=WINDOW,
+                        help="время ожидания запросов для пакета, с")
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH,
+                        help="максимальное количество запросов в пакете")
+    parser.add_argument('--cache', default=None, metavar='DIR',
+                        help="каталог кэша результатов")
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.cache) if args.cache else None
+    failures = 0
+    batcher = Batcher(DesignService(cache), args.window, args.max_batch)
+    try:
+        if args.socket:
+            serve_socket(args.socket, batcher)
+        else:
+            def write(text):
+                sys.stdout.write(text)
+                sys.stdout.flush()
+            failures = stream(batcher, sys.stdin, write)
+    finally:
+        batcher.close()
+        if cache is not None:
+            cache.close()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        store
+# Purpose:     Столбцовое хранилище результатов расчёта на диске
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import json
+import os
+
+import numpy as np
+
+import RRE
+import RRP
+
+
+# Столбцы по умолчанию: геометрия, условия расчёта, результат и признак
+# того, что радиатор отводит мощность элементов (pp >= p)
+COLUMNS = (
+    ('length', '<f8'), ('width', '<f8'), ('fin_height', '<f8'),
+    ('step', '<f8'), ('fin_thick', '<f8'), ('base_thick', '<f8'),
+    ('tb', '<f8'), ('dtr', '<f8'), ('n', '<f8'), ('fr1', '<f8'), ('k', '<f8'), ('dks', '<f8'),
+    ('w', '<f8'), ('p', '<f8'),
+    ('pp', '<f8'), ('alff', '<f8'), ('bet', '<f8'), ('adequate', '|b1'),
+)
+META_FILE = 'store.json'
+
+
+class ResultStore:
+    """
+    Хранилище результатов в каталоге: по файлу с сырыми данными на столбец
+    (<имя>.bin) и store.json со схемой и количеством записанных строк.
+
+    Запись только добавлением: данные дописываются в конец столбцов, после
+    чего store.json атомарно (os.replace) заменяется новым количеством
+    строк. Прерванная запись оставляет лишние байты в конце файлов, которые
+    читатели не видят, а следующая запись отбрасывает. Писать в каталог
+    должен один процесс; читать - сколько угодно, в том числе во время записи.
+
+    Столбцы читаются через np.memmap, поэтому срезы не загружают файл целиком.
+
+    params:
+        directory : string
+            Каталог хранилища (создаётся при необходимости)
+        columns : sequence
+            Схема [(имя, dtype), ...]. Новое хранилище по умолчанию создаётся
+            со столбцами COLUMNS; у существующего схема должна совпадать
+            с записанной (None - взять записанную)
+
+    >>> import tempfile
+    >>> directory = tempfile.mkdtemp()
+    >>> store = ResultStore(directory, [('x', '<f8'), ('ok', '|b1')])
+    >>> store.append(x=[1.0, 2.0, 3.0], ok=True)
+    3
+    >>> store.append({'x': np.arange(4, 7), 'ok': [False, True, False]})
+    6
+    >>> reader = ResultStore(directory)
+    >>> len(reader), reader.column('x')[2:5].tolist(), int(reader.column('ok').sum())
+    (6, [3.0, 4.0, 5.0], 4)
+    >>> ResultStore(directory, [('x', '<f4')]) # doctest: +ELLIPSIS
+    Traceback (most recent call last):
+    ...
+    ValueError: store ... has a different schema
+    >>> reader.append(x=1.0, ok=True, y=2.0)
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown columns: y
+    """
+    def __init__(self, directory, columns=None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        meta = self._read_meta()
+        if columns is not None:
+            columns = [[name, np.dtype(dtype).str] for name, dtype in columns]
+        if meta is None:
+            meta = {'columns': columns or [[name, np.dtype(dtype).str] for name, dtype in COLUMNS],
+                    'rows': 0}
+            self._write_meta(meta)
+        elif columns is not None and columns != meta['columns']:
+            raise ValueError("store {0} has a different schema".format(directory))
+        self.columns = {name: np.dtype(dtype) for name, dtype in meta['columns']}
+
+
+    def __repr__(self):
+        return "<ResultStore:{}; rows={}; columns={}>".format(
+            self.directory, len(self), list(self.columns))
+
+
+    def __len__(self):
+        return self._read_meta()['rows']
+
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + '.bin')
+
+
+    def _read_meta(self):
+        path = os.path.join(self.directory, META_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f_obj:
+            return json.load(f_obj)
+
+
+    def _write_meta(self, meta):
+        path = os.path.join(self.directory, META_FILE)
+        with open(path + '.tmp', "w") as f_obj:
+            json.dump(meta, f_obj)
+            f_obj.flush()
+            os.fsync(f_obj.fileno())
+        os.replace(path + '.tmp', path)
+
+
+    def append(self, values=None, **columns):
+        """
+        param:
+            values : dict
+                {столбец: значения}; можно передавать и именованными параметрами
+
+        Дописывает строки. Значения всех столбцов схемы приводятся друг к другу
+        по правилам broadcasting numpy и выравниваются в одну строку.
+        Столбцы вне схемы - ошибка, а не молча отброшенные данные.
+        Возвращает количество строк в хранилище.
+        """
+        values = dict(values or {}, **columns)
+        missing = set(self.columns) - set(values)
+        if missing:
+            raise ValueError("missing columns: {0}".format(", ".join(sorted(missing))))
+        unknown = set(values) - set(self.columns)
+        if unknown:
+            raise ValueError("unknown columns: {0}".format(", ".join(sorted(unknown))))
+        arrays = np.broadcast_arrays(*(np.asarray(values[name]) for name in self.columns))
+
+        meta = self._read_meta()
+        rows = meta['rows']
+        for (name, dtype), arr in zip(self.columns.items(), arrays):
+            path = self._path(name)
+            with open(path, "r+b" if os.path.exists(path) else "w+b") as f_obj:
+                f_obj.seek(rows * dtype.itemsize)
+                f_obj.write(np.ascontiguousarray(arr.ravel(), dtype=dtype).tobytes())
+                f_obj.truncate()
+                f_obj.flush()
+                os.fsync(f_obj.fileno())
+        meta['rows'] = rows + (arrays[0].size if arrays else 0)
+        self._write_meta(meta)
+        return meta['rows']
+
+
+    def column(self, name, rows=None):
+        """
+        Столбец name как массив только для чтения (np.memmap). rows -
+        количество видимых строк (по умолчанию записанные на момент вызова).
+        """
+        dtype = self.columns[name]
+        rows = len(self) if rows is None else rows
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode='r', shape=(rows,))
+
+
+    def read(self, names=None, start=None, stop=None):
+        """
+        Срез [start:stop] столбцов names (по умолчанию всех) как dict массивов
+        """
+        rows = len(self)
+        names = list(self.columns) if names is None else names
+        return {name: np.array(self.column(name, rows)[start:stop]) for name in names}
+
+
+def evaluate(store, length, width, fin_height, p, w=None, step=10E-3, fin_thick=1E-3,
+             base_thick=4E-3, **conditions):
+    """
+    param:
+        store : ResultStore
+            Хранилище со столбцами COLUMNS
+        length, width, fin_height, step, fin_thick, base_thick : array_like
+            Геометрия радиаторов [м]
+        p : array_like
+            Суммарная мощность элементов [Вт]
+        w : array_like
+            Скорость потока среды [м/с]; None - естественная конвекция (RRE)
+        conditions:
+            tb, dtr, n, fr1, k, dks - как в RRE.cooling_power_array
+
+    Рассчитывает мощность радиаторов через RRE/RRP.cooling_power_array
+    и записывает каждую точку (после broadcasting) в store. Возвращает
+    dict результатов cooling_power_array.
+
+    >>> import tempfile
+    >>> store = ResultStore(tempfile.mkdtemp())
+    >>> res = evaluate(store, [0.1, 0.125], [0.1, 0.152], 0.02, 30, tb=25, dtr=40, n=2,
+    ...                fr1=0.001, k=1, dks=0.008)
+    >>> res = evaluate(store, [0.1, 0.125], [0.1, 0.152], 0.02, 30, w=[[1], [2]], tb=25, dtr=40,
+    ...                n=2, fr1=0.001, k=1, dks=0.008)
+    >>> len(store), bool(np.isnan(store.column('w')[0])), store.column('w')[2:].tolist()
+    (6, True, [1.0, 1.0, 2.0, 2.0])
+    >>> bool(np.all(store.column('pp')[2:] == res['pp'].ravel()))
+    True
+    >>> res = evaluate(store, 0.1, 0.1, 0.02, 30, step=5E-3, tb=25, dtr=40, n=2, fr1=0, k=1,
+    ...                dks=0.008)
+    >>> store.column('step')[[0, 6]].tolist()
+    [0.01, 0.005]
+    """
+    geometry = {'length': length, 'width': width, 'fin_height': fin_height, 'step': step,
+                'fin_thick': fin_thick, 'base_thick': base_thick}
+    if w is None:
+        res = RRE.cooling_power_array(**geometry, **conditions)
+        w = np.nan
+    else:
+        res = RRP.cooling_power_array(**geometry, w=w, p=p, **conditions)
+
+    values = dict(conditions, **geometry, w=w, p=p, pp=res['pp'], alff=res['alff'], bet=res['bet'])
+    shape = np.broadcast_shapes(*(np.shape(value) for value in values.values()))
+    values = {name: np.broadcast_to(value, shape) for name, value in values.items()}
+    values['adequate'] = values['pp'] >= values['p']
+    store.append(values)
+    return res
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
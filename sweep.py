@@ -0,0 +1,446 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        sweep
+# Purpose:     Параметрический перебор условий подбора радиатора
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import argparse
+import json
+import math
+import os
+import socket
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+try:
+    import fcntl
+except ImportError:         # Windows
+    fcntl = None
+    import msvcrt
+
+import utils
+import RRE
+import RRP
+
+
+# Поля conditions из utils.csv_parser (в порядке файла) и скорость потока w
+CONDITIONS = ('t_air', 'h1', 'l_max', 'b_max', 'k', 's')
+FIELDS = CONDITIONS + ('w',)
+SPEC_FILE = 'sweep.json'
+MANIFEST_FILE = 'manifest.jsonl'
+
+
+def grid_size(ranges):
+    """
+    Количество точек декартова произведения ranges ({поле: список значений})
+    """
+    return math.prod(len(values) for values in ranges.values())
+
+
+def grid_point(ranges, index):
+    """
+    param:
+        ranges : dict
+            {поле: список значений}; порядок полей задаёт порядок перебора
+            (последнее поле меняется быстрее всех)
+        index : integer
+            Номер точки
+
+    Возвращает dict значений полей точки index, не строя всё произведение.
+
+    >>> ranges = {'t_air': [20, 40], 'k': [1, 2], 'w': [1, 2, 3]}
+    >>> grid_point(ranges, 0), grid_point(ranges, 7)
+    ({'t_air': 20, 'k': 1, 'w': 1}, {'t_air': 40, 'k': 1, 'w': 2})
+    """
+    point = {}
+    for name in reversed(list(ranges)):
+        index, i = divmod(index, len(ranges[name]))
+        point[name] = ranges[name][i]
+    return {name: point[name] for name in ranges}
+
+
+def parse_range(text):
+    """
+    Разбирает значения поля из командной строки: 'start:stop:step'
+    (stop включительно) или список через запятую.
+
+    >>> parse_range('0:60:20'), parse_range('1,2')
+    ([0.0, 20.0, 40.0, 60.0], [1.0, 2.0])
+    """
+    if ':' in text:
+        start, stop, step = map(float, text.split(':'))
+        count = int(math.floor((stop - start) / step + 1E-9)) + 1
+        return [round(start + i * step, 12) for i in range(count)]
+    return [float(value) for value in text.split(',')]
+
+
+def _chunk_path(directory, chunk_id):
+    return os.path.join(directory, 'chunk-{:08d}.jsonl'.format(chunk_id))
+
+
+class _FileLock:
+    """
+    Исключительная блокировка файла path средствами ОС (fcntl.flock или
+    msvcrt.locking). Снимается при закрытии файла и при завершении
+    процесса, в том числе аварийном, поэтому «зависших» блокировок нет.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._f_obj = None
+
+
+    def __repr__(self):
+        return "<_FileLock:{}; locked={}>".format(self.path, self._f_obj is not None)
+
+
+    def acquire(self, blocking=True):
+        f_obj = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f_obj, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            else:
+                f_obj.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f_obj.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise
+                        time.sleep(0.05)
+        except OSError:
+            f_obj.close()
+            return False
+        self._f_obj = f_obj
+        return True
+
+
+    def release(self):
+        self._f_obj.close()
+        self._f_obj = None
+
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _worker_id():
+    return '{}:{}'.format(socket.gethostname(), os.getpid())
+
+
+def _record(directory, chunk_id, points):
+    """
+    Дописывает законченную порцию в манифест. Новый манифест сначала
+    заполняется уже записанными порциями (каталоги прежних версий)
+    """
+    entry = {'chunk': chunk_id, 'points': points, 'worker': _worker_id(), 'time': time.time()}
+    path = os.path.join(directory, MANIFEST_FILE)
+    with _FileLock(path + '.lock'):
+        lines = []
+        if not os.path.exists(path):
+            lines = [json.dumps({'chunk': i, 'points': None, 'worker': None, 'time': None}) + "\n"
+                     for i in sorted(completed_chunks(directory) - {chunk_id})]
+        with open(path, "a") as f_obj:
+            f_obj.writelines(lines + [json.dumps(entry) + "\n"])
+            f_obj.flush()
+            os.fsync(f_obj.fileno())
+
+
+def completed_chunks(directory):
+    """
+    Номера полностью рассчитанных порций в каталоге результатов по манифесту
+    (для каталогов без манифеста - по файлам порций). Недописанная при
+    аварии последняя строка манифеста пропускается.
+    """
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        if not os.path.isdir(directory):
+            return set()
+        return {int(name[6:14]) for name in os.listdir(directory)
+                if name.startswith('chunk-') and name.endswith('.jsonl')}
+    done = set()
+    with open(path) as f_obj:
+        for line in f_obj:
+            try:
+                done.add(json.loads(line)['chunk'])
+            except ValueError:
+                continue
+    return done
+
+
+def run_point(base, point):
+    """
+    param:
+        base : dict
+            Исходные данные в формате utils.csv_parser
+        point : dict
+            Значения полей FIELDS, заменяющие исходные
+
+    Подбирает радиатор в одной точке перебора (RRP, если задана скорость w).
+    Возвращает запись, как batch.run_case: поля точки, status и параметры
+    радиатора либо error.
+    """
+    conditions = [point.get(name, value) for name, value in zip(CONDITIONS, base['conditions'])]
+    data = {'conditions': conditions, 'elements': base['elements']}
+    record = dict(point)
+    try:
+        w = point.get('w')
+        res = RRE.select(data) if w is None else RRP.select(data, w)
+    except Exception as err:
+        record.update(status='error', error='{0}: {1}'.format(type(err).__name__, err))
+        return record
+    if res is None:
+        record['status'] = 'not_found'
+    else:
+        record['status'] = 'ok'
+        record.update(res)
+    return record
+
+
+def run_chunk(directory, spec, chunk_id, block=False):
+    """
+    Рассчитывает порцию chunk_id и записывает её в каталог результатов.
+    Файл порции появляется атомарно (через os.replace), поэтому существующий
+    файл всегда означает законченную порцию; после этого порция заносится
+    в манифест. На время расчёта порция блокируется (файл chunk-N.lock), так
+    что несколько процессов, разбирающих один каталог, не считают её дважды.
+    Если block, занятая порция ждёт освобождения блокировки (другой процесс
+    досчитал её или завершился), иначе пропускается.
+    Возвращает количество рассчитанных точек (0, если порция уже посчитана
+    или её считает другой процесс).
+    """
+    ranges, chunk_size = spec['ranges'], spec['chunk_size']
+    start = chunk_id * chunk_size
+    stop = min(start + chunk_size, grid_size(ranges))
+    path = _chunk_path(directory, chunk_id)
+    lock = _FileLock(path[:-len('.jsonl')] + '.lock')
+    if not lock.acquire(blocking=block):
+        return 0
+    points = 0
+    try:
+        if os.path.exists(path):
+            # Порция могла быть записана, но не внесена в манифест до аварии
+            if chunk_id not in completed_chunks(directory):
+                _record(directory, chunk_id, stop - start)
+        else:
+            tmp = '{}.{}.tmp'.format(path, _worker_id().replace(':', '-'))
+            with open(tmp, "w") as f_obj:
+                for index in range(start, stop):
+                    record = run_point(spec['base'], grid_point(ranges, index))
+                    record['index'] = index
+                    f_obj.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp, path)
+            _record(directory, chunk_id, stop - start)
+            points = stop - start
+    finally:
+        # Файл блокировки законченной порции больше не нужен; процессы,
+        # успевшие его открыть, после захвата увидят готовый файл порции
+        if os.path.exists(path):
+            try:
+                os.remove(lock.path)
+            except OSError:
+                pass
+        lock.release()
+    return points
+
+
+def _cleanup(directory):
+    """
+    Удаляет файлы блокировок и временные файлы законченных порций, оставшиеся
+    от аварийно завершённых процессов
+    """
+    done = completed_chunks(directory)
+    for name in os.listdir(directory):
+        if name.startswith('chunk-') and name.endswith(('.lock', '.tmp')) and int(name[6:14]) in done:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def load_spec(directory):
+    """
+    Параметры перебора, записанные в каталоге результатов
+    """
+    with open(os.path.join(directory, SPEC_FILE)) as f_obj:
+        return json.load(f_obj)
+
+
+def work(directory, progress=None):
+    """
+    param:
+        directory : string
+            Каталог результатов, подготовленный sweep
+        progress : callable
+            Вызывается после каждой порции с (готово точек, всего точек)
+
+    Рабочий процесс очереди: берёт из каталога ещё не посчитанные и никем
+    не занятые порции и считает их, пока такие есть, затем дожидается
+    порций, занятых другими процессами, и досчитывает брошенные. Можно
+    запускать одновременно в нескольких процессах (и после аварии - повторно).
+    Возвращает количество точек, рассчитанных этим процессом.
+    """
+    spec = load_spec(directory)
+    total = grid_size(spec['ranges'])
+    chunk_size = spec['chunk_size']
+    done = completed_chunks(directory)
+    finished = sum(min(chunk_size, total - i * chunk_size) for i in done)
+    computed, busy = 0, []
+    for chunk_id in range(math.ceil(total / chunk_size)):
+        if chunk_id in done:
+            continue
+        points = run_chunk(directory, spec, chunk_id)
+        if not points and not os.path.exists(_chunk_path(directory, chunk_id)):
+            busy.append(chunk_id)
+        computed += points
+        finished += points
+        if points and progress:
+            progress(finished, total)
+
+    # Порции, занятые другими процессами: если процесс завершится, не досчитав, их
+    # досчитывает этот
+    for chunk_id in busy:
+        points = run_chunk(directory, spec, chunk_id, block=True)
+        computed += points
+        finished += points
+        if points and progress:
+            progress(finished, total)
+    _cleanup(directory)
+    return computed
+
+
+def sweep(base, ranges, directory, chunk_size=256, workers=None, progress=None):
+    """
+    param:
+        base : dict
+            Исходные данные в формате utils.csv_parser
+        ranges : dict
+            {поле: список значений} для полей FIELDS; остальные поля берутся
+            из base. Если задано поле w, подбор ведётся по RRP
+        directory : string
+            Каталог результатов
+        chunk_size : integer
+            Количество точек в порции
+        workers : integer
+            Количество процессов (по умолчанию os.cpu_count(); 1 - без пула)
+        progress : callable
+            Вызывается после каждой порции с (готово точек, всего точек)
+
+    Перебирает декартово произведение ranges. Точки не хранятся в памяти:
+    порции строятся по номерам и отдаются пулу процессов по мере
+    освобождения, каждая порция сразу пишется в свой файл и отмечается
+    в манифесте. Повторный запуск с тем же каталогом продолжает перебор
+    с недосчитанных порций; запуск с другими параметрами в тот же каталог -
+    ошибка ValueError. К перебору можно подключить другие процессы (work):
+    порции, которые считают они, здесь пропускаются.
+    Возвращает общее количество точек.
+
+    >>> import tempfile
+    >>> base = {'conditions': [25, 0.02, 0.125, 0.152, 1, 0.01], 'elements': [[7, 70, 2e-4, 7.6e-5, 0]]}
+    >>> out = tempfile.mkdtemp()
+    >>> sweep(base, {'t_air': [20, 40], 'k': [1, 2]}, out, chunk_size=3, workers=1)
+    4
+    >>> sorted(completed_chunks(out))
+    [0, 1]
+    >>> work(out)
+    0
+    >>> [(r['t_air'], r['k'], r['status']) for r in iter_results(out)][:2]
+    [(20, 1, 'ok'), (20, 2, 'ok')]
+    """
+    unknown = set(ranges) - set(FIELDS)
+    if unknown:
+        raise ValueError("Неизвестные поля перебора: {}".format(sorted(unknown)))
+    spec = {'base': base, 'ranges': ranges, 'chunk_size': chunk_size}
+    os.makedirs(directory, exist_ok=True)
+    spec_path = os.path.join(directory, SPEC_FILE)
+    if os.path.exists(spec_path):
+        with open(spec_path) as f_obj:
+            if json.load(f_obj) != json.loads(json.dumps(spec)):
+                raise ValueError("Каталог {} содержит перебор с другими параметрами".format(directory))
+    else:
+        with open(spec_path + '.tmp', "w") as f_obj:
+            json.dump(spec, f_obj, ensure_ascii=False)
+        os.replace(spec_path + '.tmp', spec_path)
+
+    total = grid_size(ranges)
+    done = completed_chunks(directory)
+    pending = (i for i in range(math.ceil(total / chunk_size)) if i not in done)
+    finished = sum(min(chunk_size, total - i * chunk_size) for i in done)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk_id in pending:
+            finished += run_chunk(directory, spec, chunk_id)
+            if progress:
+                progress(finished, total)
+        _cleanup(directory)
+        return total
+
+    with ProcessPoolExecutor(workers) as pool:
+        running = set()
+        for chunk_id in pending:
+            running.add(pool.submit(run_chunk, directory, spec, chunk_id))
+            if len(running) < 2 * workers:
+                continue
+            completed, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in completed:
+                finished += future.result()
+                if progress:
+                    progress(finished, total)
+        for future in running:
+            finished += future.result()
+            if progress:
+                progress(finished, total)
+    _cleanup(directory)
+    return total
+
+
+def iter_results(directory):
+    """
+    Последовательно читает записи законченных порций в порядке номеров точек
+    """
+    for chunk_id in sorted(completed_chunks(directory)):
+        with open(_chunk_path(directory, chunk_id)) as f_obj:
+            for line in f_obj:
+                yield json.loads(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Параметрический перебор условий подбора радиатора")
+    parser.add_argument('input', nargs='?', help="input файл с исходными данными (не нужен с --join)")
+    parser.add_argument('output', help="каталог результатов (для продолжения - тот же)")
+    for name in FIELDS:
+        flags = ['-' + name] if len(name) == 1 else ['--' + name.replace('_', '-')]
+        parser.add_argument(*flags, dest=name, type=parse_range,
+                            help="значения {}: start:stop:step или список через запятую".format(name))
+    parser.add_argument('--chunk-size', type=int, default=256, help="точек в порции")
+    parser.add_argument('--workers', type=int, default=None, help="количество процессов")
+    parser.add_argument('--join', action='store_true',
+                        help="подключиться к уже начатому в каталоге перебору как рабочий процесс")
+    args = parser.parse_args(argv)
+
+    def progress(finished, total):
+        print("\r{} / {}".format(finished, total), end="", file=sys.stderr)
+
+    if args.join:
+        work(args.output, progress)
+    else:
+        if args.input is None:
+            parser.error("input is required without --join")
+        ranges = {name: getattr(args, name) for name in FIELDS if getattr(args, name) is not None}
+        sweep(utils.csv_parser(args.input), ranges, args.output, args.chunk_size, args.workers, progress)
+    print(file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        tables
+# Purpose:     Таблицы мощности каталожных радиаторов для быстрого подбора
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import argparse
+import itertools
+import math
+
+import numpy as np
+
+import RRE
+from cache import model_version
+from radiators import FinnedRadiator
+from radiators import fin_radiator_generator as radiator_generator
+
+
+TB = np.linspace(-60, 100, 17)          # Температура окружающей среды [*C]
+DTR = np.geomspace(1, 150, 40)          # Допустимый перегрев [*C]
+N = np.arange(1, 9)                     # Количество элементов
+FR1 = np.linspace(0, 0.02, 21)          # Площадь срезанных рёбер [м^2]
+
+
+def _capacity(l, b, h1, k, dks, tb, dtr, n, fr1):
+    """
+    Мощность радиаторов (l, b) на сетке (tb, dtr, n, fr1). Форма результата
+    (len(l), len(tb), len(dtr), len(n), len(fr1)).
+    """
+    grid = np.meshgrid(tb, dtr, n, fr1, indexing='ij')
+    geometry = np.reshape(l, (-1, 1, 1, 1, 1)), np.reshape(b, (-1, 1, 1, 1, 1))
+    with np.errstate(over='ignore', invalid='ignore'):
+        return RRE.cooling_power_array(*geometry, h1, *grid, k, dks)['pp']
+
+
+def build(k, h1, dks=None, tb=TB, dtr=DTR, n=N, fr1=FR1):
+    """
+    param:
+        k : integer
+            1 - односторонние, 2 - двусторонние каталожные радиаторы
+        h1 : float
+            Высота рёбер [м]
+        dks : float
+            Эквивалентный радиус контакта (по умолчанию, как в RRE.main)
+        tb, dtr, n, fr1 : array
+            Узлы сетки по условиям расчёта
+
+    Рассчитывает таблицу мощности каталожных радиаторов на сетке условий.
+    Погрешность интерполяции оценивается для каждого радиатора по середине
+    всех ячеек сетки (там ошибка полилинейной интерполяции наибольшая).
+    Возвращает dict массивов, который сохраняется функцией save.
+    """
+    if dks is None:
+        dks = math.sqrt(0.2e-3/3.14)
+    catalog = np.array(radiator_generator(k))
+    l, b = catalog[:, 0], catalog[:, 1]
+    tb, dtr, n, fr1 = (np.asarray(axis, dtype=float) for axis in (tb, dtr, n, fr1))
+
+    values = _capacity(l, b, h1, k, dks, tb, dtr, n, fr1)
+
+    mid = [(axis[1:] + axis[:-1]) / 2 for axis in (tb, dtr, fr1)]
+    exact = _capacity(l, b, h1, k, dks, mid[0], dtr=mid[1], n=n, fr1=mid[2])
+    approx = 0
+    for corner in itertools.product((0, 1), repeat=3):
+        t, d, f = (slice(c, len(axis) - 1 + c) for c, axis in zip(corner, (tb, dtr, fr1)))
+        approx = approx + values[:, t, d, :, f]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        error = np.nanmax(np.abs(approx / 8 - exact) / np.abs(exact), axis=(1, 2, 3, 4))
+
+    return {'length': l, 'width': b, 'h1': h1, 'k': k, 'dks': dks,
+            'tb': tb, 'dtr': dtr, 'n': n, 'fr1': fr1,
+            'values': values.astype(np.float32), 'error': error, 'version': model_version()}
+
+
+def save(path, table):
+    """
+    Сохраняет таблицу в сжатый файл .npz
+    """
+    np.savez_compressed(path, **table)
+
+
+def load(path, check_version=True):
+    """
+    param:
+        path : string
+            Путь к файлу таблицы
+        check_version : bool
+            Проверять, что таблица построена текущей версией расчётной модели
+
+    Загружает таблицу, сохранённую функцией save.
+    """
+    with np.load(path) as data:
+        table = {key: data[key] for key in data.files}
+    for key in ('h1', 'k', 'dks', 'version'):
+        table[key] = table[key].item()
+    if check_version and table['version'] != model_version():
+        raise ValueError("Таблица {} построена другой версией расчётной модели".format(path))
+    return table
+
+
+def interpolate(table, tb, dtr, n, fr1):
+    """
+    Возвращает мощность [Вт] всех радиаторов таблицы в условиях (tb, dtr, n, fr1),
+    полученную полилинейной интерполяцией, либо None, если условия вне сетки.
+    По количеству элементов n интерполяция не ведётся (n - узел сетки).
+    """
+    ni = np.flatnonzero(table['n'] == n)
+    if len(ni) == 0:
+        return None
+
+    index, weight = [], []
+    for axis, x in ((table['tb'], tb), (table['dtr'], dtr), (table['fr1'], fr1)):
+        if not axis[0] <= x <= axis[-1]:
+            return None
+        i = min(np.searchsorted(axis, x, side='right') - 1, len(axis) - 2)
+        index.append(i)
+        weight.append((x - axis[i]) / (axis[i + 1] - axis[i]))
+
+    values = table['values'][:, :, :, ni[0], :]
+    res = 0
+    for corner in itertools.product((0, 1), repeat=3):
+        w = 1
+        for c, t in zip(corner, weight):
+            w *= t if c else 1 - t
+        res = res + w * values[:, index[0] + corner[0], index[1] + corner[1], index[2] + corner[2]]
+    return res
+
+
+def select(table, tb, dtr, n, fr1, p):
+    """
+    param:
+        table : dict
+            Таблица (build или load)
+        tb, dtr, n, fr1 : float
+            Условия расчёта, как в RRE.cooling_power
+        p : float
+            Суммарная тепловая мощность элементов [Вт]
+
+    Подбор каталожного радиатора по таблице. Радиаторы, которые по таблице
+    (с учётом оценки погрешности) заведомо не подходят, пропускаются; остальные
+    в порядке каталога проверяются точным расчётом RRE.cooling_power.
+    Вне сетки таблицы проверяется весь каталог.
+
+    Возвращает dict, как RRE.select, дополненный pp_table и error
+    (оценка относительной погрешности таблицы для выбранного радиатора),
+    либо None.
+
+    >>> table = build(1, 0.02, tb=[20, 30], dtr=[30, 40, 50], n=[1, 2], fr1=[0, 0.01])
+    >>> res = select(table, 25, 40, 2, 0.001, 10)
+    >>> res['length'], res['width'], round(res['pp'], 2), res['error'] < 0.05
+    (0.05, 0.092, 13.56, True)
+    """
+    pp_table = interpolate(table, tb, dtr, n, fr1)
+    if pp_table is None:
+        candidates = range(len(table['length']))
+    else:
+        candidates = np.flatnonzero(pp_table * (1 + table['error']) >= p)
+
+    for i in candidates:
+        l, b = float(table['length'][i]), float(table['width'][i])
+        radiator = FinnedRadiator(l, b, table['h1'])
+        pp = RRE.cooling_power(radiator, tb, dtr, n, fr1, table['k'], table['dks'], 10E-3)
+        if pp >= p:
+            return {'length': l, 'width': b, 'fin_height': table['h1'], 'area': l*b, 'pp': pp,
+                    'power': p, 'pp_table': None if pp_table is None else float(pp_table[i]),
+                    'error': float(table['error'][i])}
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Построение таблицы мощности каталожных радиаторов")
+    parser.add_argument('output', help="файл таблицы (.npz)")
+    parser.add_argument('-k', type=int, choices=[1, 2], default=1,
+                        help="одно- (1) или двусторонние (2) радиаторы")
+    parser.add_argument('--h1', type=float, required=True, help="высота рёбер, м")
+    args = parser.parse_args(argv)
+
+    table = build(args.k, args.h1)
+    save(args.output, table)
+    print("Размер таблицы {}, оценка погрешности {:.2%}".format(
+        table['values'].shape, float(np.max(table['error']))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        tolerance
+# Purpose:     Допусковый анализ методом Монте-Карло по параметрам элементов
+#              и температуре среды
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import RRE
+import RRP
+from elements import ElectronicElement
+
+
+# Параметры элементов, которые можно разыгрывать, и температура среды.
+# Разброс параметров элементов задаётся относительно номинала,
+# температуры среды - в градусах.
+ELEMENT_FIELDS = ('power', 'max_t', 'contact_space', 'temp_resist')
+KINDS = ('normal', 'uniform', 'lognormal')
+
+
+def _sample(gen, kind, spread, nominal, size, relative=True):
+    """
+    param:
+        kind : string
+            'normal' - spread это СКО, 'uniform' - полуширина интервала,
+            'lognormal' - СКО логарифма (медиана равна номиналу)
+
+    Возвращает выборку размера size вокруг номинала nominal.
+    """
+    if kind == 'lognormal':
+        return nominal * np.exp(spread * gen.standard_normal(size))
+    if kind == 'normal':
+        deviation = spread * gen.standard_normal(size)
+    elif kind == 'uniform':
+        deviation = gen.uniform(-spread, spread, size)
+    else:
+        raise ValueError("Неизвестное распределение {}; допустимы {}".format(kind, KINDS))
+    return nominal * (1 + deviation) if relative else nominal + deviation
+
+
+def _run_chunk(task):
+    """
+    Разыгрывает size вариантов и возвращает (количество отказов, сумму
+    и минимум запаса pp - p). Выполняется в дочерних процессах.
+    """
+    seed, size, geometry, columns, conditions, distributions, w = task
+    gen = np.random.default_rng(seed)
+
+    values = {}
+    for name in ELEMENT_FIELDS:
+        nominal = np.asarray(columns[name])
+        if name in distributions:
+            values[name] = _sample(gen, *distributions[name], nominal, (size, len(nominal)))
+        else:
+            values[name] = np.broadcast_to(nominal, (size, len(nominal)))
+    tb = conditions['tb']
+    if 'tb' in distributions:
+        tb = _sample(gen, *distributions['tb'], tb, size, relative=False)
+    tb = np.broadcast_to(tb, (size,))
+
+    element = ElectronicElement(values['power'], values['max_t'], values['contact_space'],
+                                values['temp_resist'], 0)
+    dtr = np.min(element.permissible_overheating(tb[:, np.newaxis]), axis=1)
+    p = np.sum(values['power'], axis=1)
+
+    args = dict(geometry, tb=tb, dtr=dtr, n=conditions['n'], fr1=conditions['fr1'],
+                k=conditions['k'], dks=conditions['dks'])
+    with np.errstate(all='ignore'):
+        if w is None:
+            pp = RRE.cooling_power_array(**args)['pp']
+        else:
+            pp = RRP.cooling_power_array(**args, w=w, p=p)['pp']
+    margin = np.where((dtr > 0) & np.isfinite(pp), pp - p, -p)
+    return int(np.count_nonzero(margin < 0)), float(np.sum(margin)), float(np.min(margin))
+
+
+def analyze(radiator, elements, tb, k, distributions, samples=100000, w=None, dks=None,
+            seed=None, chunk_size=65536, workers=None):
+    """
+    param:
+        radiator : FinnedRadiator
+            Выбранный радиатор
+        elements : SetElectronicElements
+            Набор элементов с номинальными параметрами
+        tb : float
+            Номинальная температура окружающей среды [*C]
+        k : integer
+            Одно- или двусторонний радиатор
+        distributions : dict
+            {параметр: (распределение, разброс)}, где параметр - одно из
+            ELEMENT_FIELDS или 'tb', распределение - одно из KINDS. Разброс
+            параметров элементов относительный (0.1 = 10 %), температуры
+            среды - в градусах. Параметры элементов разыгрываются
+            независимо для каждого элемента
+        samples : integer
+            Количество разыгрываемых вариантов
+        w : float
+            Скорость потока среды [м/с]. None - естественная конвекция (RRE),
+            иначе принудительная (RRP)
+        dks : float
+            Эквивалентный радиус контакта (по умолчанию, как в RRE.select)
+        seed : integer
+            Зерно генератора. Результат не зависит от workers: каждая порция
+            получает свой поток numpy.random.SeedSequence.spawn
+        chunk_size : integer
+            Размер порции - ограничивает потребление памяти
+        workers : integer
+            Количество процессов (по умолчанию os.cpu_count(); 1 - без пула)
+
+    Радиатор считается неподходящим, если допустимый перегрев неположителен
+    или отводимая мощность меньше суммарной мощности элементов.
+    Возвращает dict: samples, failures, probability (доля отказов), stderr
+    (её стандартная ошибка), mean_margin и min_margin (запас pp - p [Вт]).
+
+    >>> from radiators import FinnedRadiator
+    >>> from elements import SetElectronicElements
+    >>> pull = SetElectronicElements(ElectronicElement(5, 70, 1E-4, 7.6E-5, 0),
+    ...                              ElectronicElement(3, 80, 2E-4, 7.6E-5, 0))
+    >>> rad = FinnedRadiator(0.1, 0.1, 0.02)
+    >>> spread = {'temp_resist': ('lognormal', 0.5), 'tb': ('normal', 10)}
+    >>> res = analyze(rad, pull, 40, 1, spread, samples=20000, seed=1, chunk_size=5000, workers=1)
+    >>> res['samples'], 0 < res['probability'] < 0.5
+    (20000, True)
+    >>> res == analyze(rad, pull, 40, 1, spread, samples=20000, seed=1, chunk_size=5000, workers=2)
+    True
+    """
+    for name, (kind, spread) in distributions.items():
+        if name not in ELEMENT_FIELDS + ('tb',):
+            raise ValueError("Параметр {} не разыгрывается".format(name))
+        if kind not in KINDS:
+            raise ValueError("Неизвестное распределение {}; допустимы {}".format(kind, KINDS))
+    if dks is None:
+        dks = math.sqrt(0.2e-3/3.14)
+
+    geometry = {'length': radiator.length, 'width': radiator.width,
+                'fin_height': radiator.fin_height, 'step': radiator.step,
+                'fin_thick': radiator.fin_thick, 'base_thick': radiator.base_thick}
+    columns = {name: list(getattr(elements, name)) for name in ELEMENT_FIELDS}
+    conditions = {'tb': tb, 'n': len(elements), 'k': k, 'dks': dks,
+                  'fr1': elements.fr1_full_exclude_surface(radiator.fin_height, step=radiator.step)}
+
+    sizes = [chunk_size] * (samples // chunk_size)
+    if samples % chunk_size:
+        sizes.append(samples % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(s, size, geometry, columns, conditions, distributions, w)
+             for s, size in zip(seeds, sizes)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        results = list(map(_run_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(min(workers, len(tasks))) as pool:
+            results = list(pool.map(_run_chunk, tasks))
+
+    failures = sum(res[0] for res in results)
+    probability = failures / samples
+    return {'samples': samples, 'failures': failures, 'probability': probability,
+            'stderr': math.sqrt(probability * (1 - probability) / samples),
+            'mean_margin': sum(res[1] for res in results) / samples,
+            'min_margin': min(res[2] for res in results)}
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
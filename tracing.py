@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:        tracing
+# Purpose:     Трассировка промежуточных величин расчёта
+#
+# Author:      psybrat
+#
+# Created:     17.10.2026
+#-------------------------------------------------------------------------------
+import contextlib
+import json
+import math
+
+import numpy as np
+
+
+# Текущий приёмник трассировки: callable(event, record) или None.
+# Расчётные функции проверяют его перед сборкой записи, поэтому
+# выключенная трассировка ничего не стоит.
+tracer = None
+
+
+def set_tracer(new_tracer):
+    """
+    param:
+        new_tracer : callable or None
+            Приёмник трассировки tracer(event, record), где event - имя
+            расчётной функции, record - dict промежуточных величин
+
+    Устанавливает приёмник трассировки и возвращает предыдущий.
+    """
+    global tracer
+    previous, tracer = tracer, new_tracer
+    return previous
+
+
+@contextlib.contextmanager
+def tracing(new_tracer):
+    """
+    Включает трассировку на время блока with.
+
+    >>> import RRE
+    >>> from radiators import FinnedRadiator
+    >>> with RRE.tracing.tracing(AggregateSink()) as sink:
+    ...     pp = RRE.cooling_power(FinnedRadiator(0.1, 0.1, 0.02), 25, 40, 2, 0.001, 1, 0.008, 0.01)
+    >>> sink.summary()['RRE.cooling_power']['pp']['count']
+    1
+    """
+    previous = set_tracer(new_tracer)
+    try:
+        yield new_tracer
+    finally:
+        set_tracer(previous)
+
+
+def _to_json(value):
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class JsonLinesSink:
+    """
+    Приёмник трассировки, записывающий каждую запись строкой JSON в файл.
+
+    params:
+        path : string
+            Путь к файлу (дописывается)
+    """
+    def __init__(self, path):
+        self.path = path
+        self.f_obj = open(path, "a")
+
+
+    def __repr__(self):
+        return "<JsonLinesSink:{}>".format(self.path)
+
+
+    def __call__(self, event, record):
+        line = dict(record, event=event)
+        self.f_obj.write(json.dumps(line, default=_to_json) + "\n")
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def close(self):
+        self.f_obj.close()
+
+
+class AggregateSink:
+    """
+    Приёмник трассировки, накапливающий в памяти статистику по каждой величине:
+    количество, сумму, минимум и максимум. Величины-массивы учитываются поэлементно.
+
+    >>> sink = AggregateSink()
+    >>> sink('calc', {'pp': 1.0}); sink('calc', {'pp': np.array([2.0, 3.0])})
+    >>> sink.summary()
+    {'calc': {'pp': {'count': 3, 'min': 1.0, 'max': 3.0, 'mean': 2.0}}}
+    """
+    def __init__(self):
+        self.stats = {}
+
+
+    def __repr__(self):
+        return "<AggregateSink:events={}>".format(sorted(self.stats))
+
+
+    def __call__(self, event, record):
+        stats = self.stats.setdefault(event, {})
+        for name, value in record.items():
+            value = np.asarray(value, dtype=float)
+            count = int(np.count_nonzero(~np.isnan(value)))
+            if not count:
+                continue
+            stat = stats.setdefault(name, [0, 0.0, math.inf, -math.inf])
+            stat[0] += count
+            stat[1] += float(np.nansum(value))
+            stat[2] = min(stat[2], float(np.nanmin(value)))
+            stat[3] = max(stat[3], float(np.nanmax(value)))
+
+
+    def summary(self):
+        """
+        Возвращает dict {event: {величина: {count, min, max, mean}}}
+        """
+        return {event: {name: {'count': count, 'min': low, 'max': high, 'mean': total / count}
+                        for name, (count, total, low, high) in stats.items()}
+                for event, stats in self.stats.items()}
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -9,6 +9,11 @@
 #-------------------------------------------------------------------------------
 
 import csv
+import re
+import sys
+import warnings
+
+import numpy as np
 
 
 def line_clear(line):
@@ -24,14 +29,14 @@ def line_clear(line):
 
     >>> print(line_clear(['0', '40', '0.01', '1.125', '1.152', '1', '2']))
     [40.0, 0.01, 1.125, 1.152, 1.0, 2.0]
-    >>> print(line_clear(['1', '5', '70', '0.013', '0.000076', '6', '']))
+    >>> print(line_clear(['1', '5', '70', '0,013', '0.000076', '6', '']))
     [5.0, 70.0, 0.013, 7.6e-05, 6.0]
     """
 
     if line[0] == '0':
-        return [el for el in map(float, line[1:])]
+        return [float(el.replace(',', '.')) for el in line[1:]]
     else:
-        return [el for el in map(float, line[1:-1])]
+        return [float(el.replace(',', '.')) for el in line[1:-1]]
 
 
 def csv_parser(csv_path):
@@ -48,7 +53,6 @@ def csv_parser(csv_path):
     >>> res == {'conditions': [40.0, 0.01, 1.125, 1.152, 1.0, 2.0], 'elements': [[5.0, 70.0, 0.013, 7.6e-05, 6.0], [10.0, 70.0, 0.013, 7.6e-05, 6.0], [15.0, 50.0, 0.015, 1e-05, 0.0]]}
     True
     """
-    #TODO Обработка запятых
     #TODO перевести list в dict
     res = {'conditions': [], 'elements': []}
     with open(csv_path, "r") as f_obj:
@@ -61,6 +65,145 @@ def csv_parser(csv_path):
     return res
 
 
+CONDITIONS_FIELDS = 6    # t_air, h1, l_max, b_max, k, s
+ELEMENT_FIELDS = 5       # power, t_max, s_contact, temp_resist, viborka
+
+_BLANK_FIELD = re.compile(r'(?:^|;)\s*(?:;|$)')
+
+
+class CsvFormatError(ValueError):
+    """
+    Ошибка в строке input файла
+    """
+    def __init__(self, path, line_number, message):
+        super().__init__("{0}:{1}: {2}".format(path, line_number, message))
+        self.path, self.line_number = path, line_number
+
+
+def _row_kind(first):
+    """
+    0 - условия, 1 - элемент, None - строка пропускается (заголовок, комментарий)
+    """
+    first = first.strip()
+    if first == '0':
+        return 0
+    if first.isdigit() and int(first) > 0:
+        return 1
+    return None
+
+
+def _parse_rows(numbers, rows, width, path):
+    """
+    Строки rows (значения через ';', без номера элемента) с номерами numbers
+    в массив (len(rows), width). Все числа одного куска переводятся во float
+    одним вызовом numpy.
+    """
+    for number, row in zip(numbers, rows):
+        if row.count(';') != width - 1:
+            raise CsvFormatError(path, number, "expected {0} values, got {1}".format(
+                width, len(row.split(';'))))
+    if not rows:
+        return np.empty((0, width))
+    text = ';'.join(rows).replace(',', '.')
+    res = None
+    # np.fromstring читает пустое или пробельное значение как -1, такие куски
+    # разбираются построчно
+    if not _BLANK_FIELD.search(text):
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', DeprecationWarning)
+                res = np.fromstring(text, sep=';')
+        except ValueError:
+            pass
+    if res is not None and res.size == len(rows) * width:
+        return res.reshape(len(rows), width)
+    for number, row in zip(numbers, rows):
+        for value in row.split(';'):
+            try:
+                float(value.replace(',', '.'))
+            except ValueError:
+                raise CsvFormatError(path, number, "invalid number {0!r}".format(value)) from None
+    raise CsvFormatError(path, numbers[0], "invalid numbers")
+
+
+def iter_cases(csv_path, chunk_rows=65536):
+    """
+    param:
+        csv_path: string
+            Путь к .csv файлу (разделитель ';', десятичный разделитель '.' или ',')
+        chunk_rows: integer
+            Количество строк, читаемых и разбираемых за раз
+
+    Потоковый разбор input файла, в котором может быть несколько расчётов:
+    каждая строка условий (номер 0) начинает новый расчёт. Для каждого
+    расчёта возвращает dict, как csv_parser, но с массивами numpy:
+    conditions формы (6,) и elements формы (n, 5). Строки, не начинающиеся
+    с номера, пропускаются; строка с неверным количеством значений или
+    нечисловым значением вызывает CsvFormatError с номером строки.
+
+    >>> import os, tempfile
+    >>> fd, path = tempfile.mkstemp(suffix='.csv')
+    >>> with os.fdopen(fd, 'w') as f_obj:
+    ...     _ = f_obj.write('#;t_air;h1;l_max;b_max;k;s\\n0;40;0,01;1.125;1.152;1;2\\n'
+    ...                     '1;5;70;0,013;0.000076;6;\\n2;10;70;0.013;0.000076;6\\n'
+    ...                     '0;25;0.02;0.125;0.152;0;2\\n')
+    >>> cases = list(iter_cases(path, chunk_rows=2))
+    >>> [case['elements'].shape for case in cases]
+    [(2, 5), (0, 5)]
+    >>> cases[0]['conditions'].tolist()
+    [40.0, 0.01, 1.125, 1.152, 1.0, 2.0]
+    >>> with open(path, 'a') as f_obj:
+    ...     _ = f_obj.write('1;7;70;0.0002;x;6;\\n')
+    >>> list(iter_cases(path)) # doctest: +ELLIPSIS
+    Traceback (most recent call last):
+    ...
+    utils.CsvFormatError: ...:6: invalid number 'x'
+    >>> with open(path, 'w') as f_obj:
+    ...     _ = f_obj.write('0;25;0.02;0.125;0.152;0;2\\n1;5; ;0.013;0.000076;6;\\n')
+    >>> list(iter_cases(path)) # doctest: +ELLIPSIS
+    Traceback (most recent call last):
+    ...
+    utils.CsvFormatError: ...:2: invalid number ' '
+    >>> os.remove(path)
+    """
+    conditions, chunks = None, []
+    numbers, rows = [], []
+
+    def flush():
+        if rows:
+            chunks.append(_parse_rows(numbers, rows, ELEMENT_FIELDS, csv_path))
+            del numbers[:], rows[:]
+
+    def case():
+        elements = np.concatenate(chunks) if chunks else np.empty((0, ELEMENT_FIELDS))
+        return {'conditions': conditions, 'elements': elements}
+
+    with open(csv_path, "r") as f_obj:
+        for number, line in enumerate(f_obj, 1):
+            head, _, row = line.partition(';')
+            kind = _row_kind(head)
+            if kind is None:
+                continue
+            row = row.rstrip('; \t\r\n')
+            if kind == 1:
+                if conditions is None:
+                    raise CsvFormatError(csv_path, number, "element before conditions row")
+                numbers.append(number)
+                rows.append(row)
+                if len(rows) >= chunk_rows:
+                    flush()
+                continue
+            flush()
+            if conditions is not None:
+                yield case()
+            conditions = _parse_rows([number], [row], CONDITIONS_FIELDS, csv_path)[0]
+            chunks = []
+        flush()
+
+    if conditions is not None:
+        yield case()
+
+
 def get_real(message, name="real",default=None):
     """
     param:
@@ -92,6 +235,98 @@ def get_real(message, name="real",default=None):
             print("ERROR {0} must be an real".format(name))
 
 
+def brent_root(func, a, b, xtol=1e-9, maxiter=100):
+    """
+    param:
+        func : callable
+            Функция одной переменной
+        a, b : float
+            Границы отрезка, на концах которого func имеет разные знаки
+        xtol : float
+            Допустимая погрешность корня
+        maxiter : integer
+            Максимальное количество итераций
+
+    Ищет корень func на отрезке [a, b] методом Брента (обратная квадратичная
+    интерполяция с подстраховкой делением пополам).
+
+    >>> round(brent_root(lambda x: x**2 - 2, 0, 2), 9)
+    1.414213562
+    """
+    eps = sys.float_info.epsilon
+    fa, fb = func(a), func(b)
+    if fa * fb > 0:
+        raise ValueError("root is not bracketed in [{0}, {1}]".format(a, b))
+    c, fc = b, fb
+    d = e = b - a
+    for _ in range(maxiter):
+        if (fb > 0 and fc > 0) or (fb < 0 and fc < 0):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol = 2 * eps * abs(b) + 0.5 * xtol
+        xm = 0.5 * (c - b)
+        if abs(xm) <= tol or fb == 0:
+            return b
+        if abs(e) >= tol and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                p = 2 * xm * s
+                q = 1 - s
+            else:
+                q = fa / fc
+                r = fb / fc
+                p = s * (2 * xm * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2 * p < min(3 * xm * q - abs(tol * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = xm
+        else:
+            d = e = xm
+        a, fa = b, fb
+        b += d if abs(d) > tol else (tol if xm > 0 else -tol)
+        fb = func(b)
+    raise RuntimeError("brent_root did not converge in {0} iterations".format(maxiter))
+
+
+def bisect_root_array(func, lo, hi, xtol=1e-9, maxiter=100):
+    """
+    param:
+        func : callable
+            Векторная функция: принимает и возвращает массивы numpy
+        lo, hi : array_like
+            Границы отрезков (поэлементно), на концах которых func имеет разные знаки
+        xtol : float
+            Допустимая погрешность корней
+        maxiter : integer
+            Максимальное количество итераций
+
+    Поэлементно ищет корни func делением пополам сразу для всего массива.
+    Если на концах отрезка знаки одинаковы, возвращается его край.
+
+    >>> np.round(bisect_root_array(lambda x: x**2 - np.array([2, 9]), 0, 4), 6)
+    array([1.414214, 3.      ])
+    """
+    lo, hi = (np.array(x, dtype=float) for x in np.broadcast_arrays(lo, hi))
+    flo = func(lo)
+    for _ in range(maxiter):
+        if np.all(hi - lo <= xtol):
+            break
+        mid = 0.5 * (lo + hi)
+        fmid = func(mid)
+        left = np.sign(fmid) == np.sign(flo)
+        lo = np.where(left, mid, lo)
+        flo = np.where(left, fmid, flo)
+        hi = np.where(left, hi, mid)
+    return 0.5 * (lo + hi)
+
+
 if __name__ == '__main__':
     csv_parser('input_data')
     import doctest